@@ -0,0 +1,233 @@
+"""
+Autopilot: steers a game in place of the keyboard (attract-mode demos, soak tests).
+
+Each decision tries, in order:
+  1. the cached path to the fruit. A* runs once per fruit; the path is only kept if
+     the head can still reach the tail after eating, and stays valid tick after tick
+     as long as the head follows it.
+  2. on small even boards, the next cell of a Hamiltonian cycle, if that is safe.
+  3. the safe neighbour farthest from the tail, stalling until a safe path opens up.
+
+Searches know when each body cell will be vacated: `entered[cell]` is the tick the
+head entered it, updated by one store per tick, so the time left on any segment is
+O(1) without walking the body.
+
+    python autopilot.py --board 17 --games 20    # headless soak run
+"""
+import sys, time, heapq, argparse
+from collections import deque
+
+from engine import GAME_CORE, DIRECTIONS, MIN_CELL_NUMBER, hamiltonian_cycle
+
+CYCLE_LIMIT = 32  # boards up to 32x32 (even sides only) fall back to a Hamiltonian cycle
+NEVER = 1 << 60
+
+
+class AUTOPILOT:
+    def __init__(self, cell_number, use_cycle=None):
+        n = cell_number
+        self.cell_number = n
+        # neighbours[cell]: (cell, direction) pairs on the board, built once
+        self.neighbours = []
+        for cell in range(n * n):
+            x, y = cell % n, cell // n
+            self.neighbours.append(tuple((cell + dx + dy * n, (dx, dy)) for dx, dy in DIRECTIONS
+                                         if 0 <= x + dx < n and 0 <= y + dy < n))
+        if use_cycle is None:
+            use_cycle = n % 2 == 0 and n <= CYCLE_LIMIT
+        self.cycle_next = None
+        if use_cycle:
+            cycle = hamiltonian_cycle(n)
+            self.cycle_next = dict(zip(cycle, cycle[1:] + cycle[:1]))
+
+        self.entered = [0] * (n * n)
+        self.snake = None  # the snake `entered` is in sync with
+        self.last_tick = None
+        self.path = deque()  # cached cells to the fruit, next step first
+        self.target = None
+        self.expect = None  # head cell the cached path assumes
+        self.stalled = 0  # ticks since a safe path to the fruit was last found
+
+        self.decisions = 0
+        self.searches = 0
+        self.think_time = 0.0
+
+    @property
+    def rate(self):
+        # decisions per second of thinking time
+        return self.decisions / self.think_time if self.think_time else 0.0
+
+    def choose(self, game):
+        # Direction for the next tick; call once per tick, before game.update()
+        start = time.perf_counter()
+        direction = self.decide(game)
+        self.think_time += time.perf_counter() - start
+        self.decisions += 1
+        return direction
+
+    # ---------- Decisions ---------- #
+    def decide(self, game):
+        snake = game.snake
+        head = snake.body[0]
+        self.sync(snake, game.ticks)
+        fruit = game.fruit.cell
+        if fruit is None:
+            return snake.direction
+
+        if self.path and self.target == fruit and self.expect == head:
+            return self.follow(head)
+        self.path.clear()
+        self.target = None
+
+        occupied = snake.grid.occupied
+        entered = self.entered
+        offset = self.vacate_offset(snake, game.ticks)
+        path = self.search(snake, head, fruit, offset)
+        # after stalling for a whole board's worth of ticks, a risky path beats circling forever
+        if path is not None and (self.stalled > len(self.entered)
+                                 or self.tail_distance(snake, path, game.ticks, fruit) is not None):
+            self.stalled = 0
+            self.path.extend(path)
+            self.target = fruit
+            return self.follow(head)
+        self.stalled += 1
+
+        if self.cycle_next is not None:
+            step = self.cycle_next[head]
+            if (not occupied[step] or offset + entered[step] <= 1) and self.tail_distance(snake, [step], game.ticks, fruit) is not None:
+                return self.direction_to(head, step)
+
+        best, best_distance = None, -1
+        for cell, direction in self.neighbours[head]:
+            if occupied[cell] and offset + entered[cell] > 1:
+                continue
+            distance = self.tail_distance(snake, [cell], game.ticks, fruit)
+            if distance is not None and distance > best_distance:
+                best, best_distance = direction, distance
+            elif best is None and best_distance < 0:
+                best = direction  # trapped either way; at least don't hit a wall
+        return best if best is not None else snake.direction
+
+    def follow(self, head):
+        step = self.path.popleft()
+        self.expect = step
+        return self.direction_to(head, step)
+
+    def direction_to(self, head, cell):
+        for neighbour, direction in self.neighbours[head]:
+            if neighbour == cell:
+                return direction
+        raise ValueError(f"cell {cell} is not next to {head}")
+
+    # ---------- Body timing ---------- #
+    def sync(self, snake, tick):
+        # One store per tick while following a game; a full walk only on a new game or a gap
+        if snake is self.snake and tick == self.last_tick + 1:
+            self.entered[snake.body[0]] = tick
+        elif snake is not self.snake or tick != self.last_tick:
+            for age, cell in enumerate(snake.body):
+                self.entered[cell] = tick - age
+            self.snake = snake
+            self.path.clear()
+            self.stalled = 0
+        self.last_tick = tick
+
+    def vacate_offset(self, snake, tick):
+        # A body cell may be entered from step `offset + entered[cell]` on (its segment has moved on)
+        return len(snake.body) + (1 if snake.new_block else 0) - tick
+
+    # ---------- Search ---------- #
+    def search(self, snake, start, goal, offset, overrides=None):
+        # A* on the grid; occupied cells open up as the body moves, `overrides` maps cells to
+        # the step they open at when that differs from the live body
+        self.searches += 1
+        n = self.cell_number
+        gx, gy = goal % n, goal // n
+        neighbours = self.neighbours
+        occupied = snake.grid.occupied
+        entered = self.entered
+        best = {start: 0}
+        parent = {}
+        heap = [(0, 0, start)]
+        while heap:
+            _, negative_steps, cell = heapq.heappop(heap)
+            if cell == goal:
+                break
+            steps = 1 - negative_steps
+            if steps - 1 > best[cell]:
+                continue
+            for neighbour, _ in neighbours[cell]:
+                if steps >= best.get(neighbour, NEVER):
+                    continue
+                if overrides and neighbour in overrides:
+                    if overrides[neighbour] > steps:
+                        continue
+                elif occupied[neighbour] and offset + entered[neighbour] > steps:
+                    continue
+                best[neighbour] = steps
+                parent[neighbour] = cell
+                estimate = steps + abs(neighbour % n - gx) + abs(neighbour // n - gy)
+                heapq.heappush(heap, (estimate, -steps, neighbour))
+        else:
+            return None
+        path = []
+        cell = goal
+        while cell != start:
+            path.append(cell)
+            cell = parent[cell]
+        path.reverse()
+        return path
+
+    def tail_distance(self, snake, path, tick, fruit):
+        # Steps from the head to the tail after following `path`, or None if the tail is cut off.
+        # The body then is the path (reversed) followed by the front of the current body.
+        steps = len(path)
+        length = len(snake.body) + (1 if snake.new_block else 0)
+        grow = 1 if path[-1] == fruit else 0  # eating at the end keeps the tail still one more tick
+        # path cell i is body segment steps-1-i then, and opens once the length-segment tail passes it
+        overrides = {cell: length - (steps - 1 - index) + grow for index, cell in enumerate(path)}
+        tail = path[steps - length] if length <= steps else snake.body[length - 1 - steps]
+        route = self.search(snake, path[-1], tail, length + grow - steps - tick, overrides)
+        return None if route is None else len(route)
+
+
+# ---------------------- Soak Run ---------------------- #
+def soak(cell_number, games, seed=0, max_ticks=None):
+    pilot = AUTOPILOT(cell_number)
+    game = GAME_CORE(cell_number, start=False, seed=seed)
+    limit = max_ticks or 100 * cell_number ** 4
+    results = []
+    for _ in range(games):
+        game.start_game()
+        while game.state == "PLAYING" and game.ticks < limit:
+            game.step(pilot.choose(game))
+        results.append({"seed": game.game_seed, "score": game.score, "ticks": game.ticks, "won": game.won})
+    return pilot, results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the autopilot headlessly and report scores")
+    parser.add_argument("--board", type=int, default=17, help="board side in cells (default: 17)")
+    parser.add_argument("--games", type=int, default=10, help="games to play (default: 10)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game (default: 0)")
+    parser.add_argument("--max-ticks", type=int, help="give up on a game after this many ticks")
+    args = parser.parse_args(argv)
+    if args.board < MIN_CELL_NUMBER:
+        parser.error(f"board must be at least {MIN_CELL_NUMBER} cells (the snake starts at row 10)")
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+
+    start = time.perf_counter()
+    pilot, results = soak(args.board, args.games, args.seed, args.max_ticks)
+    elapsed = time.perf_counter() - start
+    for result in results:
+        print(f"seed {result['seed']:>6}  score {result['score']:>6}  ticks {result['ticks']:>8}"
+              + ("  WIN" if result["won"] else ""))
+    scores = [result["score"] for result in results]
+    print(f"mean score {sum(scores) / len(scores):.1f}, wins {sum(r['won'] for r in results)}/{len(results)}, "
+          f"{pilot.rate:,.0f} decisions/s, {pilot.searches} searches, {elapsed:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Parameter sweeps and soak tests on all cores.
+
+Every combination of seed, board size and controller is one headless GAME_CORE game,
+run as fast as the CPU allows (no timer). Difficulty only sets the tick interval, so
+each game is simulated once and reported as one row per difficulty, with the time a
+human would have spent at that speed. Results stream to a JSONL or CSV file as games
+finish, and a summary per (board, difficulty, controller) is printed at the end.
+
+    python batch_runner.py --games 1000 --boards 17 32 --controllers autopilot greedy --out runs.jsonl
+    python batch_runner.py --games 200 --difficulties 0 1 2 --out runs.csv --summary summary.json
+"""
+import os, sys, csv, json, time, random, argparse, itertools
+from multiprocessing import Pool
+from statistics import mean, median
+
+from engine import GAME_CORE, DIRECTIONS, TICK_MS, MIN_CELL_NUMBER
+from autopilot import AUTOPILOT
+
+FIELDS = ("seed", "board", "difficulty", "controller", "score", "ticks", "cause", "game_seconds", "wall_seconds")
+
+
+# ---------------------- Controllers ---------------------- #
+class RANDOM_TURNS:
+    """Baseline: turns at random every few ticks, with no lookahead."""
+
+    def __init__(self, cell_number, seed):
+        self.rng = random.Random(seed)
+
+    def choose(self, game):
+        return self.rng.choice(DIRECTIONS) if self.rng.random() < 0.2 else None
+
+
+class GREEDY:
+    """Heads for the fruit along whichever free neighbour is closest to it; no lookahead."""
+
+    def __init__(self, cell_number, seed):
+        self.cell_number = cell_number
+
+    def choose(self, game):
+        n = self.cell_number
+        snake = game.snake
+        head, tail = snake.body[0], snake.body[-1]
+        x, y = head % n, head // n
+        fruit = game.fruit.cell
+        fx, fy = fruit % n, fruit // n
+        best, best_distance = None, None
+        for dx, dy in DIRECTIONS:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < n and 0 <= ny < n):
+                continue
+            cell = ny * n + nx
+            if snake.grid.occupied[cell] and (cell != tail or snake.new_block):
+                continue
+            distance = abs(nx - fx) + abs(ny - fy)
+            if best_distance is None or distance < best_distance:
+                best, best_distance = (dx, dy), distance
+        return best
+
+
+_autopilots = {}  # per worker process: the neighbour tables are built once per board size
+
+
+def new_autopilot(cell_number, seed):
+    # an AUTOPILOT resynchronizes itself when it sees a new snake, so games can share one
+    if cell_number not in _autopilots:
+        _autopilots[cell_number] = AUTOPILOT(cell_number)
+    return _autopilots[cell_number]
+
+
+CONTROLLERS = {"autopilot": new_autopilot, "greedy": GREEDY, "random": RANDOM_TURNS}
+
+
+# ---------------------- Worker ---------------------- #
+def play(job):
+    # One game in a worker process, one result row per difficulty; all plain data
+    seed, board, controller, difficulties, max_ticks = job
+    start = time.perf_counter()
+    pilot = CONTROLLERS[controller](board, seed)
+    game = GAME_CORE(board, start=False)
+    game.start_game(seed=seed)
+    limit = max_ticks or 200 * board * board
+    while game.state == "PLAYING" and game.ticks < limit:
+        game.step(pilot.choose(game))
+    if game.won:
+        cause = "won"
+    elif game.state == "PLAYING":
+        cause = "timeout"
+    else:
+        cause = game.snake.crash_cause
+    wall_seconds = time.perf_counter() - start
+    return [{
+        "seed": seed, "board": board, "difficulty": difficulty, "controller": controller,
+        "score": game.score, "ticks": game.ticks, "cause": cause,
+        "game_seconds": game.ticks * TICK_MS[difficulty] / 1000,  # time a human would have spent
+        "wall_seconds": wall_seconds,
+    } for difficulty in difficulties]
+
+
+# ---------------------- Output ---------------------- #
+class RESULT_WRITER:
+    """Appends one row per finished game, as JSONL or CSV depending on the file name."""
+
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.csv = None
+        if path.endswith(".csv"):
+            self.csv = csv.DictWriter(self.file, fieldnames=FIELDS)
+            self.csv.writeheader()
+
+    def write(self, result):
+        if self.csv is not None:
+            self.csv.writerow(result)
+        else:
+            self.file.write(json.dumps(result) + "\n")
+        self.file.flush()  # readable (and safe) while a long sweep is still running
+
+    def close(self):
+        self.file.close()
+
+
+def summarize(results):
+    groups = {}
+    for result in results:
+        groups.setdefault((result["board"], result["difficulty"], result["controller"]), []).append(result)
+    summary = []
+    for (board, difficulty, controller), rows in sorted(groups.items()):
+        scores = [row["score"] for row in rows]
+        causes = {}
+        for row in rows:
+            causes[row["cause"]] = causes.get(row["cause"], 0) + 1
+        ticks = sum(row["ticks"] for row in rows)
+        summary.append({
+            "board": board, "difficulty": difficulty, "controller": controller, "games": len(rows),
+            "mean_score": mean(scores), "median_score": median(scores), "max_score": max(scores),
+            "mean_ticks": ticks / len(rows), "mean_game_seconds": mean(row["game_seconds"] for row in rows),
+            "causes": causes, "ticks_per_s": ticks / sum(row["wall_seconds"] for row in rows),
+        })
+    return summary
+
+
+def print_summary(summary):
+    print(f"\n{'board':>5} {'diff':>4} {'controller':<10} {'games':>6} {'mean':>8} {'median':>7} "
+          f"{'max':>6} {'ticks/s':>10}  causes")
+    for row in summary:
+        causes = " ".join(f"{cause}={count}" for cause, count in sorted(row["causes"].items()))
+        print(f"{row['board']:>5} {row['difficulty']:>4} {row['controller']:<10} {row['games']:>6} "
+              f"{row['mean_score']:>8.1f} {row['median_score']:>7.1f} {row['max_score']:>6} "
+              f"{row['ticks_per_s']:>10,.0f}  {causes}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many seeded headless games in parallel")
+    parser.add_argument("--games", type=int, default=100, help="seeds per combination (default: 100)")
+    parser.add_argument("--seed", type=int, default=0, help="first seed (default: 0)")
+    parser.add_argument("--boards", type=int, nargs="+", default=[17], help="board sizes (default: 17)")
+    parser.add_argument("--difficulties", type=int, nargs="+", default=[1], choices=range(len(TICK_MS)),
+                        help="difficulty indexes, 0 Easy .. 2 Hard (default: 1)")
+    parser.add_argument("--controllers", nargs="+", default=["autopilot"], choices=sorted(CONTROLLERS),
+                        help="who plays (default: autopilot)")
+    parser.add_argument("--max-ticks", type=int, help="stop a game after this many ticks (default: 200 x cells)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes (default: all cores)")
+    parser.add_argument("--out", default="results.jsonl", help="per-game results, .jsonl or .csv")
+    parser.add_argument("--summary", help="also write the aggregate statistics to this JSON file")
+    args = parser.parse_args(argv)
+    if min(args.boards) < MIN_CELL_NUMBER:
+        parser.error(f"boards must be at least {MIN_CELL_NUMBER} cells (the snake starts at row 10)")
+
+    difficulties = sorted(set(args.difficulties))
+    jobs = [(seed, board, controller, difficulties, args.max_ticks)
+            for board, controller, seed in itertools.product(
+                args.boards, args.controllers, range(args.seed, args.seed + args.games))]
+    writer = RESULT_WRITER(args.out)
+    results = []
+    games = 0
+    start = time.perf_counter()
+    try:
+        with Pool(args.workers) as pool:
+            # small chunks keep results streaming; unordered so one slow game blocks nothing
+            for rows in pool.imap_unordered(play, jobs, chunksize=max(1, len(jobs) // (args.workers * 32))):
+                for result in rows:
+                    writer.write(result)
+                results.extend(rows)
+                games += 1
+                if games % 100 == 0 or games == len(jobs):
+                    print(f"\r{games}/{len(jobs)} games", end="", file=sys.stderr, flush=True)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+
+    summary = summarize(results)
+    print_summary(summary)
+    print(f"\n{games} games ({len(results)} rows) in {elapsed:.1f} s on {args.workers} workers; results in {args.out}")
+    if args.summary:
+        with open(args.summary, "w") as file:
+            json.dump(summary, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Benchmarks for the hot loop, run on SDL's dummy video/audio drivers (no window).
+
+    python bench.py                             # default matrix, writes bench.json
+    python bench.py --boards 17 256 --lengths 3 1000 --out new.json
+    python bench.py --compare old.json          # also print the change against an earlier run
+
+Measured per (cell_number, snake length):
+  tick    MAIN.update: move_snake + check_collision/check_fail + dirty-cell marking
+  core    the same tick on the headless GAME_CORE
+  clone   GAME_STATE.clone() plus one step of the copy (a search branch)
+  draw    MAIN.draw_elements, a full-board redraw
+  frame   one tick followed by MAIN.render (the dirty-cell path the game uses)
+and per cell_number:
+  start   MAIN.start_game restart latency
+
+Long snakes are laid along engine.hamiltonian_cycle and steered along it, so a
+run never ends in a crash. Boards larger than --view cells scroll under the camera,
+so draw/frame costs should stay flat as the board grows.
+"""
+import os, json, time, argparse, platform, tempfile
+from statistics import median
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import main
+from engine import GAME_CORE, DIRECTIONS, hamiltonian_cycle
+
+DEFAULT_BOARDS = (17, 64, 256, 1024)
+DEFAULT_LENGTHS = (3, 100, 1000, 10_000, 100_000)
+
+
+# ---------------------- Board Setup ---------------------- #
+class COURSE:
+    """A Hamiltonian cycle on one board: where to lay a snake and how to steer it."""
+
+    def __init__(self, cell_number):
+        n = cell_number
+        self.cycle = hamiltonian_cycle(n)
+        step_direction = {-n: DIRECTIONS[0], 1: DIRECTIONS[1], n: DIRECTIONS[2], -1: DIRECTIONS[3]}
+        self.steer = [None] * (n * n)
+        for cell, following in zip(self.cycle, self.cycle[1:] + self.cycle[:1]):
+            self.steer[cell] = step_direction[following - cell]
+
+    def fits(self, length):
+        # leave half the loop free so fruit keeps spawning and growth never closes the loop
+        return 2 * length <= len(self.cycle)
+
+    def place(self, game, length):
+        # head at cycle[length - 1], tail at cycle[0]
+        game.snake.reset(self.cycle[length - 1::-1])
+        game.snake.direction = self.steer[game.snake.body[0]]
+        game.fruit.randomize()
+        if main.camera is not None:
+            main.camera.follow(game.snake.body[0], center=True)
+
+    def run(self, game, ticks, length, after_tick=None):
+        # Time `ticks` ticks one by one; re-laying the snake before it could fill the loop is untimed
+        steer = self.steer
+        room = len(self.cycle) - 1
+        samples = []
+        while len(samples) < ticks:
+            chunk = min(ticks - len(samples), 1000, room - length)
+            if len(game.snake.body) + chunk > room:
+                self.place(game, length)
+            snake = game.snake
+            for _ in range(chunk):
+                start = time.perf_counter()
+                snake.direction = steer[snake.body[0]]
+                game.update()
+                if after_tick is not None:
+                    after_tick()
+                samples.append(time.perf_counter() - start)
+            if game.state != "PLAYING":
+                raise RuntimeError(f"benchmark game ended after {game.ticks} ticks")
+        return samples
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def timing(bench, cell_number, length, samples):
+    return {
+        "bench": bench, "cell_number": cell_number, "length": length, "runs": len(samples),
+        "mean_us": sum(samples) / len(samples) * 1e6,
+        "p50_us": median(samples) * 1e6,
+        "p99_us": percentile(samples, 0.99) * 1e6,
+        "per_s": len(samples) / sum(samples),
+    }
+
+
+# ---------------------- Benchmarks ---------------------- #
+def bench_board(cell_number, view, lengths, ticks, frames, restarts, high_score_file):
+    game = main.setup(fps=0, board=cell_number, view=view, high_score_file=high_score_file, seed=0)
+    course = COURSE(cell_number)
+    results = []
+
+    game.start_game()  # the first game loads the sprites; only restarts are timed
+    samples = []
+    for _ in range(restarts):
+        start = time.perf_counter()
+        game.start_game()
+        samples.append(time.perf_counter() - start)
+    results.append(timing("start", cell_number, 3, samples))
+
+    core = GAME_CORE(cell_number, seed=0)
+    for length in lengths:
+        if not course.fits(length):
+            continue
+        course.place(core, length)
+        results.append(timing("core", cell_number, length, course.run(core, ticks, length)))
+        state = core.snapshot()
+        direction = course.steer[state.head]
+        samples = []
+        for _ in range(ticks):
+            start = time.perf_counter()
+            state.clone().step(direction)
+            samples.append(time.perf_counter() - start)
+        results.append(timing("clone", cell_number, length, samples))
+
+        course.place(game, length)
+        game.dirty.clear()
+        results.append(timing("tick", cell_number, length, course.run(game, ticks, length)))
+
+        course.place(game, length)
+        game.full_redraw = True
+        game.render()
+        samples = []
+        for _ in range(frames):
+            start = time.perf_counter()
+            game.draw_elements()
+            samples.append(time.perf_counter() - start)
+        results.append(timing("draw", cell_number, length, samples))
+
+        game.full_redraw = True
+        game.render()
+        results.append(timing("frame", cell_number, length, course.run(game, frames, length, game.render)))
+        print(f"  board {cell_number:>5} length {length:>7}: "
+              + "  ".join(f"{r['bench']} {r['mean_us']:9.1f} us" for r in results[-5:]), flush=True)
+
+    main.high_scores.close()
+    return results
+
+
+def compare(results, baseline):
+    # mean time per run against an earlier JSON file; >1.00x means slower now
+    old = {(r["bench"], r["cell_number"], r["length"]): r["mean_us"] for r in baseline["results"]}
+    print("\nbench   board   length     old us     new us   ratio")
+    for r in results:
+        key = (r["bench"], r["cell_number"], r["length"])
+        if key in old:
+            print(f"{r['bench']:<6} {r['cell_number']:>6} {r['length']:>8} {old[key]:>10.1f} "
+                  f"{r['mean_us']:>10.1f} {r['mean_us'] / old[key]:>6.2f}x")
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Hungry Python's tick and frame times")
+    parser.add_argument("--boards", type=int, nargs="+", default=DEFAULT_BOARDS, help="cell_number values")
+    parser.add_argument("--lengths", type=int, nargs="+", default=DEFAULT_LENGTHS, help="snake lengths")
+    parser.add_argument("--view", type=int, default=main.view_cells, help="window side in cells (default: 17)")
+    parser.add_argument("--ticks", type=int, default=5000, help="ticks per tick/core case (default: 5000)")
+    parser.add_argument("--frames", type=int, default=200, help="frames per draw/frame case (default: 200)")
+    parser.add_argument("--restarts", type=int, default=200, help="start_game calls per board (default: 200)")
+    parser.add_argument("--out", default="bench.json", help="results file (default: bench.json)")
+    parser.add_argument("--compare", metavar="FILE", help="earlier results to compare against")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # the benchmark's scores must not reach the player's high score file
+        high_score_file = os.path.join(tmp, "highscore.txt")
+        for cell_number in args.boards:
+            results.extend(bench_board(cell_number, args.view, args.lengths, args.ticks, args.frames,
+                                       args.restarts, high_score_file))
+    pygame.quit()
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "args": vars(args),
+        "results": results,
+    }
+    with open(args.out, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,663 @@
+import random
+from array import array
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:  # only BATCH_GAME needs numpy
+    np = None
+
+# ---------------------- Board Helpers ---------------------- #
+# Directions as (dx, dy); the index order is also the action encoding of BATCH_GAME
+UP = (0, -1)
+RIGHT = (1, 0)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+STOP = (0, 0)
+DIRECTIONS = (UP, RIGHT, DOWN, LEFT)
+
+START_BODY = ((5, 10), (4, 10), (3, 10))  # head first
+MIN_CELL_NUMBER = max(max(x, y) for x, y in START_BODY) + 1  # smallest board the start body fits on
+
+TICK_MS = (200, 150, 100)  # tick interval per difficulty_index: Easy, Normal, Hard
+SEED_MASK = 2 ** 64 - 1  # game seeds are unsigned 64-bit (the replay header stores them so)
+INPUT_QUEUE = 3  # turns that can wait for upcoming ticks (e.g. a quick U-turn is two)
+
+
+def cell_index(x, y, cell_number):
+    # Cells are stored as plain ints (row-major) so body/occupancy lookups are O(1)
+    return int(y) * cell_number + int(x)
+
+
+def cell_coords(cell, cell_number):
+    y, x = divmod(cell, cell_number)
+    return x, y
+
+
+def hamiltonian_cycle(cell_number):
+    """
+    Cells of a closed loop that visits every cell once: along the top row, snaking
+    down through columns 1.., then back up column 0. Needs an even side, so odd boards
+    get the loop over their top-left (n-1)x(n-1) cells.
+    """
+    m = cell_number - cell_number % 2
+    cycle = [cell_index(x, 0, cell_number) for x in range(m)]
+    for y in range(1, m):
+        columns = range(m - 1, 0, -1) if y % 2 else range(1, m)
+        cycle.extend(cell_index(x, y, cell_number) for x in columns)
+    cycle.extend(cell_index(0, y, cell_number) for y in range(m - 1, 0, -1))
+    return cycle
+
+
+class GRID:
+    """
+    Occupancy bitmap plus an index of free cells.
+    `free` is a swap-remove array and `free_pos[cell]` is the cell's slot in it
+    (-1 while occupied), so occupy/release/random_free are all O(1).
+    """
+
+    def __init__(self, size):
+        self.occupied = bytearray(size)
+        self.free = list(range(size))
+        self.free_pos = list(range(size))
+
+    def occupy(self, cell):
+        if self.occupied[cell]:
+            return
+        self.occupied[cell] = 1
+        # swap the last free cell into this cell's slot, then drop the tail
+        slot = self.free_pos[cell]
+        last = self.free.pop()
+        if last != cell:
+            self.free[slot] = last
+            self.free_pos[last] = slot
+        self.free_pos[cell] = -1
+
+    def release(self, cell):
+        if not self.occupied[cell]:
+            return
+        self.occupied[cell] = 0
+        self.free_pos[cell] = len(self.free)
+        self.free.append(cell)
+
+    @classmethod
+    def from_arrays(cls, occupied, free, free_pos):
+        # rebuild a grid from GAME_STATE's arrays (keeps the free-list order, so fruit matches)
+        grid = cls.__new__(cls)
+        grid.occupied = bytearray(occupied)
+        grid.free = list(free)
+        grid.free_pos = list(free_pos)
+        return grid
+
+    def random_free(self, rng=random):
+        # None means the board is full
+        if not self.free:
+            return None
+        return self.free[rng.randrange(len(self.free))]
+
+
+# ---------------------- Headless Rules ---------------------- #
+class SNAKE_CORE:
+    def __init__(self, cell_number=17, grid=None, cells=None):
+        # `grid` lets several snakes share one board (each sees the others as obstacles)
+        self.cell_number = cell_number
+        self.shared_grid = grid
+        self.grid = None
+        self.reset(cells)
+
+    def reset(self, cells=None):
+        # body: deque of int cells (head first); grid: occupancy/free cells kept in sync
+        n = self.cell_number
+        if cells is None:
+            cells = [cell_index(x, y, n) for x, y in START_BODY]
+        if self.shared_grid is not None:
+            self.grid = self.shared_grid
+        elif self.grid is None:
+            self.grid = GRID(n * n)
+        else:
+            # re-laid on its own board: clear the grid in place, the fruit holds it too
+            for block in self.body:
+                self.grid.release(block)
+        self.body = deque(cells)
+        for block in self.body:
+            self.grid.occupy(block)
+        self.direction = STOP
+        self.new_block = False
+        self.crashed = False
+        self.crash_cause = None  # "wall" or "self" once crashed
+
+    def change_direction(self, direction):
+        # Reversing straight into the neck is not allowed
+        if direction[0] == -self.direction[0] and direction[1] == -self.direction[1] and direction != STOP:
+            return False
+        self.direction = direction
+        return True
+
+    def move_snake(self):
+        # If direction is zero, don't move
+        dx, dy = self.direction
+        if dx == 0 and dy == 0:
+            return
+        n = self.cell_number
+        x, y = cell_coords(self.body[0], n)
+        x += dx
+        y += dy
+        # border collision: the head stays on the board and the game ends
+        if not 0 <= x < n or not 0 <= y < n:
+            self.crashed = True
+            self.crash_cause = "wall"
+            return
+        new_head = cell_index(x, y, n)
+
+        # tail leaves first, so following the tail closely is still legal
+        if self.new_block:
+            self.new_block = False
+        else:
+            self.grid.release(self.body.pop())
+
+        # self collision
+        if self.grid.occupied[new_head]:
+            self.crashed = True
+            self.crash_cause = "self"
+        self.grid.occupy(new_head)
+        self.body.appendleft(new_head)
+
+    def add_block(self):
+        self.new_block = True
+
+    def play_crunch_sound(self):
+        # Hook for the renderer; headless games are silent
+        pass
+
+
+class FRUIT_CORE:
+    def __init__(self, grid, cell_number=17, rng=random):
+        self.grid = grid
+        self.cell_number = cell_number
+        self.rng = rng
+        self.randomize()
+
+    def randomize(self):
+        # spawn on a cell the snake does not occupy; cell is None once the board is full
+        self.cell = self.grid.random_free(self.rng)
+        if self.cell is None:
+            return
+        self.x, self.y = cell_coords(self.cell, self.cell_number)
+
+
+class GAME_CORE:
+    """
+    Game rules without any pygame dependency. MAIN renders on top of this;
+    bots and tools can drive it directly with step().
+    """
+
+    def __init__(self, cell_number=17, start=True, seed=None):
+        # With a seed, game k of this session uses seed + k; otherwise each game draws a fresh
+        # seed. Either way game_seed alone reproduces a game's fruit sequence.
+        if cell_number < MIN_CELL_NUMBER:
+            raise ValueError(f"board must be at least {MIN_CELL_NUMBER} cells (the snake starts at row 10)")
+        self.cell_number = cell_number
+        self.seed = seed
+        self.games = 0
+        self.game_seed = None
+        self.rng = random
+        self.ticks = 0
+        self.turns = deque()  # (direction, stamp) applied one per tick
+        self.snake = None
+        self.fruit = None
+        self.won = False
+        self.last_score = 0
+        self.state = "GAME_OVER"
+        if start:
+            GAME_CORE.start_game(self)  # not the subclass override: no UI side effects here
+
+    def new_snake(self):
+        return SNAKE_CORE(self.cell_number)
+
+    def new_fruit(self):
+        return FRUIT_CORE(self.snake.grid, self.cell_number, self.rng)
+
+    def start_game(self, seed=None):
+        if seed is None:
+            seed = (self.seed + self.games) & SEED_MASK if self.seed is not None else random.getrandbits(32)
+        self.games += 1
+        self.game_seed = seed
+        self.rng = random.Random(seed)
+        self.ticks = 0
+        self.turns.clear()
+        self.snake = self.new_snake()
+        self.fruit = self.new_fruit()
+        self.won = False
+        self.last_score = 0
+        self.state = "PLAYING"
+        # Immediately set a safe direction to the right to avoid stuck state
+        self.snake.direction = RIGHT
+
+    @property
+    def score(self):
+        return len(self.snake.body) - len(START_BODY)
+
+    def queue_turn(self, direction, stamp=None):
+        # Buffered input: checked against the last queued direction, applied on successive ticks
+        last = self.turns[-1][0] if self.turns else self.snake.direction
+        if len(self.turns) >= INPUT_QUEUE or direction == last:
+            return False
+        if direction[0] == -last[0] and direction[1] == -last[1]:
+            return False
+        self.turns.append((direction, stamp))
+        return True
+
+    def apply_turn(self, direction, stamp=None):
+        # The one place a turn reaches the snake; `stamp` is whatever queue_turn was given
+        return self.snake.change_direction(direction)
+
+    def update(self):
+        if self.state == "PLAYING":
+            if self.turns:
+                self.apply_turn(*self.turns.popleft())
+            self.ticks += 1
+            self.snake.move_snake()
+            self.check_collision()
+            self.check_fail()
+
+    def step(self, direction=None):
+        # One tick with an optional turn; returns True while the game is still running
+        if direction is not None:
+            self.apply_turn(direction)
+        self.update()
+        return self.state == "PLAYING"
+
+    def check_collision(self):
+        if self.fruit.cell == self.snake.body[0]:
+            self.fruit.randomize()
+            self.snake.add_block()
+            self.snake.play_crunch_sound()
+            # no free cell left for the next fruit: the snake fills the board
+            if self.fruit.cell is None:
+                self.won = True
+                self.game_over()
+
+    def check_fail(self):
+        # border and self collision are detected by move_snake via the occupancy bitmap
+        if self.snake.crashed and self.state == "PLAYING":
+            self.game_over()
+
+    def game_over(self):
+        self.last_score = self.score
+        self.state = "GAME_OVER"
+
+    def snapshot(self):
+        # The rule state of the running game; O(cells) here, O(1) for every clone of it
+        return GAME_STATE(self)
+
+    def restore(self, state):
+        # Rewind (or fast-forward) to `state`, reusing the live snake and fruit objects
+        snake, fruit = self.snake, self.fruit
+        snake.body = state.body()
+        snake.grid = fruit.grid = state.grid()
+        snake.direction = state.direction
+        snake.new_block = state.new_block
+        snake.crashed = state.crashed
+        snake.crash_cause = state.crash_cause
+        self.rng.setstate(state.rng_state)
+        fruit.cell = state.fruit
+        if fruit.cell is not None:
+            fruit.x, fruit.y = cell_coords(fruit.cell, self.cell_number)
+        self.turns.clear()
+        self.turns.extend(state.turns)
+        self.ticks = state.ticks
+        self.won = state.won
+        self.last_score = state.last_score
+        self.state = state.state
+
+
+# ---------------------- Game State ---------------------- #
+_scratch_rng = random.Random()  # replays a stored rng state for the rare fruit spawn
+
+
+class GAME_STATE:
+    """
+    A game's rule state, free of pygame objects, for search bots and rollback.
+    update()/step() follow GAME_CORE exactly, fruit sequence included.
+
+    clone() is O(1) and a branch's first step stays far below O(cells):
+      board  flat occupancy / free-list arrays that are never written once built,
+             shared by every clone, plus a small per-branch diff (copied on a
+             branch's first write). The diff is flattened into fresh arrays, an
+             O(cells) copy, once it outgrows `4 * cell_number` entries, so on big
+             boards that copy happens every few hundred steps of a line of play.
+      body   the window [start, end) of `trail`, an append-only array of head cells
+             (tail first) shared by clones. The first branch to step appends in
+             place; its siblings copy their window, an O(length) memcpy.
+    """
+
+    __slots__ = ("cell_number", "trail", "start", "end", "occupied", "free", "free_pos",
+                 "occupied_diff", "free_diff", "free_pos_diff", "free_count", "owned",
+                 "direction", "new_block", "crashed", "crash_cause", "fruit", "rng_state",
+                 "turns", "ticks", "won", "last_score", "state")
+
+    def __init__(self, game):
+        snake = game.snake
+        grid = snake.grid
+        self.cell_number = game.cell_number
+        self.trail = array("i", reversed(snake.body))
+        self.start = 0
+        self.end = len(self.trail)
+        self.occupied = bytearray(grid.occupied)
+        self.free = array("i", grid.free)
+        self.free_pos = array("i", grid.free_pos)
+        self.occupied_diff = {}  # cell -> 0/1
+        self.free_diff = {}  # free-list slot -> cell
+        self.free_pos_diff = {}  # cell -> free-list slot (-1 while occupied)
+        self.free_count = len(grid.free)
+        self.owned = True
+        self.direction = snake.direction
+        self.new_block = snake.new_block
+        self.crashed = snake.crashed
+        self.crash_cause = snake.crash_cause
+        self.fruit = game.fruit.cell
+        self.rng_state = game.rng.getstate()
+        self.turns = tuple(game.turns)
+        self.ticks = game.ticks
+        self.won = game.won
+        self.last_score = game.last_score
+        self.state = game.state
+
+    def clone(self):
+        copy = GAME_STATE.__new__(GAME_STATE)
+        copy.cell_number = self.cell_number
+        copy.trail = self.trail
+        copy.start = self.start
+        copy.end = self.end
+        copy.occupied = self.occupied
+        copy.free = self.free
+        copy.free_pos = self.free_pos
+        copy.occupied_diff = self.occupied_diff
+        copy.free_diff = self.free_diff
+        copy.free_pos_diff = self.free_pos_diff
+        copy.free_count = self.free_count
+        copy.owned = self.owned = False
+        copy.direction = self.direction
+        copy.new_block = self.new_block
+        copy.crashed = self.crashed
+        copy.crash_cause = self.crash_cause
+        copy.fruit = self.fruit
+        copy.rng_state = self.rng_state  # immutable tuple
+        copy.turns = self.turns
+        copy.ticks = self.ticks
+        copy.won = self.won
+        copy.last_score = self.last_score
+        copy.state = self.state
+        return copy
+
+    @property
+    def head(self):
+        return self.trail[self.end - 1]
+
+    @property
+    def length(self):
+        return self.end - self.start
+
+    @property
+    def score(self):
+        return self.end - self.start - len(START_BODY)
+
+    def body(self):
+        # head first, like SNAKE_CORE.body
+        return deque(reversed(self.trail[self.start:self.end]))
+
+    def grid(self):
+        # A GRID equal to GAME_CORE's at this point, free-list order included
+        return GRID.from_arrays(*self.flattened())
+
+    # ---------- Rules (mirror SNAKE_CORE / GAME_CORE) ---------- #
+    def change_direction(self, direction):
+        if direction[0] == -self.direction[0] and direction[1] == -self.direction[1] and direction != STOP:
+            return False
+        self.direction = direction
+        return True
+
+    def step(self, direction=None):
+        if direction is not None:
+            self.change_direction(direction)
+        self.update()
+        return self.state == "PLAYING"
+
+    def update(self):
+        if self.state != "PLAYING":
+            return
+        if self.turns:
+            self.change_direction(self.turns[0][0])
+            self.turns = self.turns[1:]
+        self.ticks += 1
+        self.move_snake()
+        if self.fruit == self.trail[self.end - 1]:
+            self.fruit = self.random_free()
+            self.new_block = True
+            if self.fruit is None:
+                self.won = True
+                self.game_over()
+        if self.crashed and self.state == "PLAYING":
+            self.game_over()
+
+    def move_snake(self):
+        dx, dy = self.direction
+        if dx == 0 and dy == 0:
+            return
+        n = self.cell_number
+        y, x = divmod(self.trail[self.end - 1], n)
+        x += dx
+        y += dy
+        if not 0 <= x < n or not 0 <= y < n:
+            self.crashed = True
+            self.crash_cause = "wall"
+            return
+        new_head = y * n + x
+        if not self.owned:
+            self.own()
+        if self.new_block:
+            self.new_block = False
+        else:
+            self.release(self.trail[self.start])
+            self.start += 1
+        if self.is_occupied(new_head):
+            self.crashed = True
+            self.crash_cause = "self"
+        self.occupy(new_head)
+        self.push(new_head)
+        if len(self.occupied_diff) + len(self.free_diff) + len(self.free_pos_diff) > 4 * n:
+            self.flatten()
+
+    def game_over(self):
+        self.last_score = self.score
+        self.state = "GAME_OVER"
+
+    # ---------- Storage ---------- #
+    def own(self):
+        # first write since a clone: private copies of the diffs (the base arrays stay shared)
+        self.occupied_diff = dict(self.occupied_diff)
+        self.free_diff = dict(self.free_diff)
+        self.free_pos_diff = dict(self.free_pos_diff)
+        self.owned = True
+
+    def flattened(self):
+        # the base arrays with the diff applied, as new arrays
+        occupied = bytearray(self.occupied)
+        for cell, value in self.occupied_diff.items():
+            occupied[cell] = value
+        count = self.free_count
+        free = self.free[:count]
+        if len(free) < count:
+            free.extend([0] * (count - len(free)))  # slots past the base only live in the diff
+        for slot, cell in self.free_diff.items():
+            if slot < count:
+                free[slot] = cell
+        free_pos = array("i", self.free_pos)
+        for cell, slot in self.free_pos_diff.items():
+            free_pos[cell] = slot
+        return occupied, free, free_pos
+
+    def flatten(self):
+        self.occupied, self.free, self.free_pos = self.flattened()
+        self.occupied_diff = {}
+        self.free_diff = {}
+        self.free_pos_diff = {}
+        self.owned = True
+
+    def is_occupied(self, cell):
+        value = self.occupied_diff.get(cell)
+        return self.occupied[cell] if value is None else value
+
+    def free_cell(self, slot):
+        cell = self.free_diff.get(slot)
+        return self.free[slot] if cell is None else cell
+
+    def push(self, cell):
+        trail = self.trail
+        if self.end != len(trail) or (self.start > 64 and 2 * self.start > self.end):
+            # another branch wrote past our end, or the dead prefix outgrew the body
+            trail = self.trail = trail[self.start:self.end]
+            self.end -= self.start
+            self.start = 0
+        trail.append(cell)
+        self.end += 1
+
+    def occupy(self, cell):
+        # GRID.occupy, written to the diff
+        if self.is_occupied(cell):
+            return
+        self.occupied_diff[cell] = 1
+        slot = self.free_pos_diff.get(cell)
+        if slot is None:
+            slot = self.free_pos[cell]
+        self.free_count -= 1
+        last = self.free_cell(self.free_count)
+        if last != cell:
+            self.free_diff[slot] = last
+            self.free_pos_diff[last] = slot
+        self.free_pos_diff[cell] = -1
+
+    def release(self, cell):
+        if not self.is_occupied(cell):
+            return
+        self.occupied_diff[cell] = 0
+        self.free_pos_diff[cell] = self.free_count
+        self.free_diff[self.free_count] = cell
+        self.free_count += 1
+
+    def random_free(self):
+        # GRID.random_free with the stored rng state, so fruit lands where GAME_CORE puts it
+        if not self.free_count:
+            return None
+        _scratch_rng.setstate(self.rng_state)
+        cell = self.free_cell(_scratch_rng.randrange(self.free_count))
+        self.rng_state = _scratch_rng.getstate()
+        return cell
+
+
+# ---------------------- Vectorized Batch ---------------------- #
+class BATCH_GAME:
+    """
+    Steps many independent games at once as NumPy arrays (same rules as GAME_CORE).
+
+    Each body is a ring buffer of cells: `body[i, head[i]]` is the head and the
+    previous `length[i] - 1` slots (wrapping) are the rest of the snake.
+    Actions are indices into DIRECTIONS, or -1 to keep going straight.
+    """
+
+    def __init__(self, n_games, cell_number=17, seed=None):
+        if np is None:
+            raise RuntimeError("BATCH_GAME requires numpy")
+        self.n = n_games
+        self.cell_number = cell_number
+        self.cells = cell_number * cell_number
+        self.rng = np.random.default_rng(seed)
+        self.dx = np.array([d[0] for d in DIRECTIONS], dtype=np.int32)
+        self.dy = np.array([d[1] for d in DIRECTIONS], dtype=np.int32)
+
+        self.body = np.zeros((n_games, self.cells), dtype=np.int32)
+        self.head = np.zeros(n_games, dtype=np.int32)
+        self.length = np.zeros(n_games, dtype=np.int32)
+        self.occupied = np.zeros((n_games, self.cells), dtype=bool)
+        self.direction = np.zeros(n_games, dtype=np.int8)
+        self.fruit = np.zeros(n_games, dtype=np.int32)
+        self.new_block = np.zeros(n_games, dtype=bool)
+        self.done = np.zeros(n_games, dtype=bool)
+        self.won = np.zeros(n_games, dtype=bool)
+        self.ticks = np.zeros(n_games, dtype=np.int64)
+        self.reset()
+
+    @property
+    def score(self):
+        return self.length - len(START_BODY)
+
+    def head_cells(self):
+        return self.body[np.arange(self.n), self.head]
+
+    def reset(self, mask=None):
+        rows = np.arange(self.n) if mask is None else np.flatnonzero(mask)
+        if rows.size == 0:
+            return
+        start = np.array([cell_index(x, y, self.cell_number) for x, y in reversed(START_BODY)], dtype=np.int32)
+        self.occupied[rows] = False
+        self.body[rows, :len(start)] = start
+        self.occupied[rows[:, None], start[None, :]] = True
+        self.head[rows] = len(start) - 1
+        self.length[rows] = len(start)
+        self.direction[rows] = DIRECTIONS.index(RIGHT)
+        self.new_block[rows] = False
+        self.done[rows] = False
+        self.won[rows] = False
+        self.ticks[rows] = 0
+        self.spawn_fruit(rows)
+
+    def spawn_fruit(self, rows):
+        # Pick a uniformly random free cell per row; rows with no free cell have won
+        weights = self.rng.random((rows.size, self.cells))
+        weights[self.occupied[rows]] = -1.0
+        choice = weights.argmax(axis=1)
+        full = weights[np.arange(rows.size), choice] < 0
+        self.fruit[rows] = choice
+        self.won[rows[full]] = True
+        self.done[rows[full]] = True
+
+    def step(self, actions=None):
+        """Advance every running game one tick. Returns (ate, died) boolean masks."""
+        alive = ~self.done
+        if actions is not None:
+            actions = np.asarray(actions)
+            turn = alive & (actions >= 0) & (actions != (self.direction + 2) % 4)
+            self.direction[turn] = actions[turn]
+
+        n = self.cell_number
+        head = self.head_cells()
+        x = head % n + self.dx[self.direction]
+        y = head // n + self.dy[self.direction]
+        wall = alive & ((x < 0) | (x >= n) | (y < 0) | (y >= n))
+        moving = np.flatnonzero(alive & ~wall)
+        new_head = (y * n + x)[moving]
+
+        # tail leaves first unless the snake is growing this tick
+        shrink = moving[~self.new_block[moving]]
+        tail_slot = (self.head[shrink] - self.length[shrink] + 1) % self.cells
+        self.occupied[shrink, self.body[shrink, tail_slot]] = False
+        self.length[shrink] -= 1
+        self.new_block[moving] = False
+
+        hit = self.occupied[moving, new_head]
+        self.occupied[moving, new_head] = True
+        self.head[moving] = (self.head[moving] + 1) % self.cells
+        self.body[moving, self.head[moving]] = new_head
+        self.length[moving] += 1
+        self.ticks[alive] += 1
+
+        died = wall.copy()
+        died[moving[hit]] = True
+        ate = np.zeros(self.n, dtype=bool)
+        ate[moving[(new_head == self.fruit[moving]) & ~hit]] = True
+        self.new_block[ate] = True
+        self.done |= died
+        eaten = np.flatnonzero(ate)
+        if eaten.size:
+            self.spawn_fruit(eaten)
+        return ate, died
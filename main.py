@@ -1,23 +1,37 @@
-import pygame, sys, random
-from pygame.math import Vector2
+import time
+START_TIME = time.perf_counter()  # reference point for --startup-time
+
+import pygame, sys, os, io, json, hashlib, threading, argparse
 from pathlib import Path
+from collections import OrderedDict, deque
+
+from engine import SNAKE_CORE, FRUIT_CORE, GAME_CORE, UP, RIGHT, DOWN, LEFT, DIRECTIONS, TICK_MS, SEED_MASK, cell_coords, cell_index
+from replay import REPLAY, REPLAY_PLAYER
+from autopilot import AUTOPILOT
 
 # ---------------------- Helper / Asset Utilities ---------------------- #
 ASSET_DIR = Path("Graphics")
 SOUND_DIR = Path("Sound")
 FONT_DIR = Path("Font")
+FONT_FILE = FONT_DIR / "PoetsenOne-Regular.ttf"
+FONT_SIZES = {"game": 25, "menu": 32, "title": 64, "small": 18, "debug": 14}
+BASE_CELL_SIZE = 34  # FONT_SIZES and the menu/HUD layout are in pixels at this cell size
+MIN_CELL_SIZE = 8
 
 
-def load_image_or_fallback(paths, size=None):
+def load_image_or_fallback(paths, size=None, convert=True):
     """
     Try multiple filenames in order; if none exist, produce a simple surface fallback.
-    `paths` is a list of Path or str candidates.
+    `paths` is a list of Path or str candidates. Pass convert=False when no display
+    exists yet (e.g. on a loader thread); convert_alpha() is then up to the caller.
     """
     for p in paths:
         p = Path(p)
         if p.exists():
             try:
-                img = pygame.image.load(str(p)).convert_alpha()
+                img = pygame.image.load(str(p))
+                if convert:
+                    img = img.convert_alpha()
                 if size is not None:
                     img = pygame.transform.smoothscale(img, size)
                 return img
@@ -29,9 +43,32 @@ def load_image_or_fallback(paths, size=None):
     return surf
 
 
+def cell_rect(cell):
+    # Screen rect of a board cell under the current camera
+    x, y = cell_coords(cell, cell_number)
+    return pygame.Rect((x - camera.x0) * cell_size, (y - camera.y0) * cell_size, cell_size, cell_size)
+
+
+def scale(px):
+    # A layout distance designed for BASE_CELL_SIZE cells, at the current cell size
+    return round(px * cell_size / BASE_CELL_SIZE)
+
+
+def init_mixer():
+    # The audio device is only opened once a sound file actually needs it
+    if pygame.mixer.get_init():
+        return True
+    try:
+        pygame.mixer.pre_init(44100, -16, 2, 512)
+        pygame.mixer.init()
+    except pygame.error:
+        return False
+    return True
+
+
 def load_sound_or_none(path):
     p = Path(path)
-    if p.exists():
+    if p.exists() and init_mixer():
         try:
             return pygame.mixer.Sound(str(p))
         except Exception:
@@ -39,462 +76,1322 @@ def load_sound_or_none(path):
     return None
 
 
-# ---------------------- Game Classes ---------------------- #
-class SNAKE:
-    def __init__(self, skin_index=1):
-        self.skin = skin_index
-        self.reset_graphics()
-        self.reset()
+def font(name):
+    """Font for one of FONT_SIZES at the current scale; the TTF is read once and each size is built on first use.
 
-    def reset(self):
-        self.body = [Vector2(5, 10), Vector2(4, 10), Vector2(3, 10)]
-        self.direction = Vector2(0, 0)
-        self.new_block = False
+    Fonts live in the asset registry under the current cell size, so they are dropped
+    with the sprites of that size instead of piling up across window resizes.
+    """
+    def build():
+        global font_bytes
+        if font_bytes is None:
+            font_bytes = FONT_FILE.read_bytes() if FONT_FILE.exists() else b""
+        return pygame.font.Font(io.BytesIO(font_bytes) if font_bytes else None, max(6, scale(FONT_SIZES[name])))
 
-    def reset_graphics(self):
-        # Load images; try skin2 then default if not found
-        s = self.skin
-        size = (cell_size, cell_size)
+    return assets.cached((None, f"font {name}", (cell_size, cell_size)), build)
 
-        def candidates(name):
-            if s == 2:
-                return [ASSET_DIR / f"skin2_{name}.png", ASSET_DIR / f"{name}.png"]
-            else:
-                return [ASSET_DIR / f"{name}.png", ASSET_DIR / f"skin2_{name}.png"]
 
-        # head
-        self.head_up = load_image_or_fallback(candidates("head_up"), size)
-        self.head_down = load_image_or_fallback(candidates("head_down"), size)
-        self.head_right = load_image_or_fallback(candidates("head_right"), size)
-        self.head_left = load_image_or_fallback(candidates("head_left"), size)
+def apple_image():
+    # Loaded on first use; the menu never needs it
+    return assets.image(1, "apple", (cell_size, cell_size))
 
-        # tail
-        self.tail_up = load_image_or_fallback(candidates("tail_up"), size)
-        self.tail_down = load_image_or_fallback(candidates("tail_down"), size)
-        self.tail_right = load_image_or_fallback(candidates("tail_right"), size)
-        self.tail_left = load_image_or_fallback(candidates("tail_left"), size)
 
-        # body
-        self.body_vertical = load_image_or_fallback(candidates("body_vertical"), size)
-        self.body_horizontal = load_image_or_fallback(candidates("body_horizontal"), size)
+def play_sound(filename):
+    sound = assets.sound(filename)
+    if sound:
+        sound.play()
 
-        self.body_tr = load_image_or_fallback(candidates("body_tr"), size)
-        self.body_tl = load_image_or_fallback(candidates("body_tl"), size)
-        self.body_br = load_image_or_fallback(candidates("body_br"), size)
-        self.body_bl = load_image_or_fallback(candidates("body_bl"), size)
 
-        # sounds
-        self.crunch_sound = load_sound_or_none(SOUND_DIR / "crunch.wav")
+class ASSET_REGISTRY:
+    """
+    Process-wide cache of images keyed by (skin, name, size) and sounds keyed by file name.
+    Every file is read and scaled at most once per size; preload() warms the cache on a
+    background thread so restarts and skin switches never touch the disk.
+    Surfaces are kept for the last `max_sizes` cell sizes, so switching back and forth
+    between window sizes is free. With `disk_dir` set, scaled sprites are also stored
+    there, keyed by the source file's hash and the size, and later launches skip the
+    smoothscale.
+    """
 
-    def draw_snake(self):
-        self.update_head_graphics()
-        self.update_tail_graphics()
-
-        for index, block in enumerate(self.body):
-            x_pos = int(block.x * cell_size)
-            y_pos = int(block.y * cell_size)
-            block_rect = pygame.Rect(x_pos, y_pos, cell_size, cell_size)
-
-            if index == 0:
-                screen.blit(self.head, block_rect)
-            elif index == len(self.body) - 1:
-                screen.blit(self.tail, block_rect)
-            else:
-                previous_block = self.body[index + 1] - block
-                next_block = self.body[index - 1] - block
-                # vertical
-                if previous_block.x == next_block.x:
-                    screen.blit(self.body_vertical, block_rect)
-                elif previous_block.y == next_block.y:
-                    screen.blit(self.body_horizontal, block_rect)
-                else:
-                    # corners
-                    if (previous_block.x == -1 and next_block.y == -1) or (previous_block.y == -1 and next_block.x == -1):
-                        screen.blit(self.body_tl, block_rect)
-                    elif (previous_block.x == -1 and next_block.y == 1) or (previous_block.y == 1 and next_block.x == -1):
-                        screen.blit(self.body_bl, block_rect)
-                    elif (previous_block.x == 1 and next_block.y == -1) or (previous_block.y == -1 and next_block.x == 1):
-                        screen.blit(self.body_tr, block_rect)
-                    elif (previous_block.x == 1 and next_block.y == 1) or (previous_block.y == 1 and next_block.x == 1):
-                        screen.blit(self.body_br, block_rect)
-
-    def update_head_graphics(self):
-        # Determine head graphic by relation of second segment to head
-        if len(self.body) > 1:
-            head_relation = self.body[1] - self.body[0]
-            if head_relation == Vector2(1, 0):
-                self.head = self.head_left
-            elif head_relation == Vector2(-1, 0):
-                self.head = self.head_right
-            elif head_relation == Vector2(0, 1):
-                self.head = self.head_up
-            elif head_relation == Vector2(0, -1):
-                self.head = self.head_down
-        else:
-            self.head = self.head_right
-
-    def update_tail_graphics(self):
-        if len(self.body) > 1:
-            tail_relation = self.body[-2] - self.body[-1]
-            if tail_relation == Vector2(1, 0):
-                self.tail = self.tail_left
-            elif tail_relation == Vector2(-1, 0):
-                self.tail = self.tail_right
-            elif tail_relation == Vector2(0, 1):
-                self.tail = self.tail_up
-            elif tail_relation == Vector2(0, -1):
-                self.tail = self.tail_down
+    def __init__(self, max_sizes=3):
+        self.images = {}
+        self.sounds = {}
+        self.derived = {}  # surfaces built from images, e.g. the snake atlas; keys are (skin, name, size) too
+        self.pending = {}  # decoded by the loader thread, not yet convert_alpha()'d
+        self.lock = threading.Lock()
+        self.loader = None
+        self.max_sizes = max_sizes
+        self.sizes = OrderedDict()  # sizes with surfaces in memory, least recently used first
+        self.disk_dir = None
+        self.hashes = {}  # source path -> content hash
+
+    @staticmethod
+    def candidates(skin, name):
+        # Try skin2 then default if not found (or the other way round for skin 1)
+        if skin == 2:
+            return [ASSET_DIR / f"skin2_{name}.png", ASSET_DIR / f"{name}.png"]
+        return [ASSET_DIR / f"{name}.png", ASSET_DIR / f"skin2_{name}.png"]
+
+    def image(self, skin, name, size):
+        key = (skin, name, size)
+        img = self.images.get(key)
+        if img is None:
+            with self.lock:
+                raw = self.pending.pop(key, None)
+            started = profiler.start()
+            if raw is None:
+                raw = self.load(skin, name, size)
+            # convert_alpha needs the display, so it always happens on the main thread
+            img = self.images[key] = raw.convert_alpha()
+            self.use_size(size)
+            profiler.record("asset load", started)
+        return img
+
+    def load(self, skin, name, size):
+        # Decoded and scaled, not converted; safe on any thread
+        paths = self.candidates(skin, name)
+        if self.disk_dir is not None:
+            source = next((path for path in paths if path.exists()), None)
+            if source is not None:
+                return self.load_scaled(source, size)
+        return load_image_or_fallback(paths, size, convert=False)
+
+    def load_scaled(self, source, size):
+        # Raw RGBA in the disk cache: reading it back needs no PNG decode and no smoothscale
+        digest = self.hashes.get(source)
+        if digest is None:
+            digest = self.hashes[source] = hashlib.sha1(source.read_bytes()).hexdigest()[:16]
+        path = self.disk_dir / f"{digest}-{size[0]}x{size[1]}.rgba"
+        try:
+            return pygame.image.frombytes(path.read_bytes(), size, "RGBA")
+        except (OSError, ValueError):
+            pass  # not cached yet, or a partial file
+        img = load_image_or_fallback([source], size, convert=False)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(pygame.image.tobytes(img, "RGBA"))
+            os.replace(tmp, path)
+        except OSError:
+            pass  # a read-only cache only costs the scaling
+        return img
+
+    def use_size(self, size):
+        # Mark `size` as in use; surfaces of sizes beyond the newest `max_sizes` are dropped
+        self.sizes[size] = True
+        self.sizes.move_to_end(size)
+        while len(self.sizes) > self.max_sizes:
+            old, _ = self.sizes.popitem(last=False)
+            for table in (self.images, self.derived):
+                for key in [key for key in table if key[2] == old]:
+                    del table[key]
+
+    def sound(self, filename):
+        if filename not in self.sounds:
+            started = profiler.start()
+            self.sounds[filename] = load_sound_or_none(SOUND_DIR / filename)
+            profiler.record("sound load", started)
+        return self.sounds[filename]
+
+    def cached(self, key, build):
+        # Memoize anything derived from registry images (same lifetime as the images)
+        if key not in self.derived:
+            self.derived[key] = build()
+            self.use_size(key[2])
+        return self.derived[key]
+
+    def preload(self, keys):
+        """Decode and scale `keys` ((skin, name, size) tuples) on a daemon thread."""
+        def work():
+            for key in keys:
+                with self.lock:
+                    if key in self.pending:
+                        continue
+                if key in self.images:
+                    continue
+                started = profiler.start()
+                raw = self.load(*key)
+                profiler.record("asset preload", started)
+                with self.lock:
+                    self.pending[key] = raw
+
+        self.loader = threading.Thread(target=work, name="asset-preload", daemon=True)
+        self.loader.start()
+
+
+class HIGH_SCORE_STORE:
+    """
+    High score kept in memory and persisted by a background writer thread.
+    set() never touches the disk: bursts of updates are coalesced for `debounce`
+    seconds, then written atomically (temp file + os.replace). close() does the
+    final synchronous flush on quit.
+    """
+
+    def __init__(self, path, debounce=1.0):
+        self.path = Path(path)
+        self.debounce = debounce
+        self.value = self.read()
+        self.saved = self.value
+        self.urgent = False
+        self.closed = False
+        self.cond = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.writer = threading.Thread(target=self.run, name="highscore-writer", daemon=True)
+        self.writer.start()
+
+    def read(self):
+        try:
+            return int(self.path.read_text())
+        except (OSError, ValueError):
+            return 0
+
+    def set(self, score, urgent=False):
+        # urgent skips the debounce window (e.g. at game over)
+        with self.cond:
+            self.value = score
+            self.urgent = self.urgent or urgent
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.value == self.saved and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                deadline = time.monotonic() + self.debounce
+                while not self.closed and not self.urgent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                self.urgent = False
+            self.flush()
+
+    def flush(self):
+        with self.write_lock:
+            value = self.value
+            if value == self.saved:
+                return
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            started = profiler.start()
+            try:
+                tmp.write_text(str(value))
+                os.replace(tmp, self.path)
+                self.saved = value
+            except OSError:
+                pass
+            profiler.record("high score write", started)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.writer.join(timeout=1.0)
+        self.flush()
+
+
+class TEXT_CACHE:
+    """
+    Bounded LRU of rendered text surfaces keyed by (font, text, colour).
+    HUD and menu strings rarely change, so most frames are pure cache hits.
+    """
+
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = font.render(text, True, color)
+        self.surfaces[key] = surf
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surf
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.surfaces)}
+
+
+class SCHEDULER:
+    """
+    Fixed simulation timestep driven by an accumulator instead of a pygame timer.
+    ticks_due() says how many game ticks to run this frame; wait_events() sleeps on
+    the event queue until input arrives or (while playing) the next tick is due,
+    so menus and pauses cost no CPU. Rendering is capped at `max_fps`.
+    """
+
+    def __init__(self, step_ms, max_fps=60, interpolate=False, max_catch_up=5):
+        self.step_ms = step_ms
+        self.max_fps = max_fps
+        self.interpolate = interpolate
+        self.max_catch_up = max_catch_up
+        self.accumulator = 0.0
+        self.last = time.perf_counter()
+        self.running = False
+        self.clock = pygame.time.Clock()
+
+    def set_step(self, step_ms):
+        self.step_ms = step_ms
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.last = time.perf_counter()
+
+    def ticks_due(self, running):
+        now = time.perf_counter()
+        elapsed = (now - self.last) * 1000.0
+        self.last = now
+        was_running, self.running = self.running, running
+        if not running:
+            self.accumulator = 0.0
+            return 0
+        if not was_running:
+            # resuming (from a pause or a menu): the time spent blocked in wait_events is not game time
+            self.accumulator = 0.0
+            return 0
+        self.accumulator += elapsed
+        ticks = int(self.accumulator // self.step_ms)
+        self.accumulator -= ticks * self.step_ms
+        # after a long stall, drop the backlog instead of fast-forwarding the game
+        return min(ticks, self.max_catch_up)
+
+    def tick_progress(self):
+        # fraction of the interval since the last tick, measured now (alpha is per frame)
+        return (self.accumulator + (time.perf_counter() - self.last) * 1000.0) / self.step_ms
+
+    def alpha(self):
+        # progress towards the next tick, for interpolated drawing
+        return min(self.accumulator / self.step_ms, 1.0)
+
+    def wait_events(self, running):
+        if not running:
+            return [pygame.event.wait()] + pygame.event.get()
+        if self.interpolate:
+            return pygame.event.get()
+        # nothing moves between ticks: sleep until the next tick unless input arrives first
+        timeout = int(self.step_ms - self.accumulator - (time.perf_counter() - self.last) * 1000.0)
+        if timeout > 0:
+            event = pygame.event.wait(timeout)
+            if event.type != pygame.NOEVENT:
+                return [event] + pygame.event.get()
+        return pygame.event.get()
+
+    def pace(self):
+        self.clock.tick(self.max_fps)
+
+
+class CAMERA:
+    """
+    The part of the board shown in the window, in whole cells: columns x0..x0+cols-1
+    and rows y0..y0+rows-1. follow() scrolls just enough to keep the head `margin` cells
+    from the edges, so all drawing work scales with the window, not the board.
+    """
+
+    def __init__(self, cell_number, view_cells, margin=4):
+        self.cell_number = cell_number
+        self.cols = self.rows = min(view_cells, cell_number)
+        self.margin = min(margin, (self.cols - 1) // 2)
+        self.scrolls = self.cols < cell_number  # False: the whole board is always in view
+        self.x0 = self.y0 = 0
+        self.visible = None  # world cells in view, built on demand
+
+    @property
+    def area(self):
+        return self.cols * self.rows
+
+    @property
+    def shift(self):
+        # the checkerboard repeats every 2 cells; odd offsets read the background one cell over
+        return (self.x0 + self.y0) % 2 * cell_size
+
+    def follow(self, cell, center=False):
+        # True when the view moved (the whole window has to be redrawn)
+        x, y = cell_coords(cell, self.cell_number)
+        if center:
+            x0, y0 = x - self.cols // 2, y - self.rows // 2
         else:
-            self.tail = self.tail_left
+            x0 = min(max(self.x0, x + self.margin + 1 - self.cols), x - self.margin)
+            y0 = min(max(self.y0, y + self.margin + 1 - self.rows), y - self.margin)
+        x0 = max(0, min(x0, self.cell_number - self.cols))
+        y0 = max(0, min(y0, self.cell_number - self.rows))
+        if (x0, y0) == (self.x0, self.y0):
+            return False
+        self.x0, self.y0 = x0, y0
+        self.visible = None
+        return True
+
+    def contains(self, cell):
+        y, x = divmod(cell, self.cell_number)
+        return 0 <= x - self.x0 < self.cols and 0 <= y - self.y0 < self.rows
+
+    def clamp(self, cell):
+        # nearest cell inside the view
+        x, y = cell_coords(cell, self.cell_number)
+        x = max(self.x0, min(x, self.x0 + self.cols - 1))
+        y = max(self.y0, min(y, self.y0 + self.rows - 1))
+        return cell_index(x, y, self.cell_number)
+
+    def cells(self):
+        if self.visible is None:
+            n = self.cell_number
+            self.visible = [y * n + x for y in range(self.y0, self.y0 + self.rows)
+                            for x in range(self.x0, self.x0 + self.cols)]
+        return self.visible
+
+    def screen_pos(self, x, y):
+        # pixel position of (possibly fractional) board coordinates
+        return (x - self.x0) * cell_size, (y - self.y0) * cell_size
+
+
+class PROFILER:
+    """
+    Timings for the frame loop phases (and disk/asset work on any thread).
+    start()/record() bracket a phase: the last `window` samples per phase feed the F3
+    overlay (FPS, ticks/s, p50/p99), and with a trace file every span is also kept as a
+    Chrome trace event (open in chrome://tracing or Perfetto). While neither is on,
+    start() returns None and record() does nothing.
+    """
 
-    def move_snake(self):
-        # If direction is zero, don't move
-        if self.direction == Vector2(0, 0):
+    MAX_TRACE_EVENTS = 1_000_000
+
+    def __init__(self, window=300):
+        self.window = window
+        self.samples = {}  # phase -> deque of seconds
+        self.overlay = False
+        self.trace_path = None
+        self.trace = []
+        self.threads = {}  # thread id -> name, for the trace viewer
+        self.origin = time.perf_counter()
+        self.frame_times = deque(maxlen=window)  # frame end timestamps
+        self.tick_times = deque(maxlen=window)
+        self.surface = None
+        self.rendered_at = 0.0
+
+    def start(self):
+        if self.overlay or self.trace_path is not None:
+            return time.perf_counter()
+        return None
+
+    def record(self, name, started):
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+        samples.append(duration)
+        if self.trace_path is not None and len(self.trace) < self.MAX_TRACE_EVENTS:
+            thread = threading.get_ident()
+            if thread not in self.threads:
+                self.threads[thread] = threading.current_thread().name
+            self.trace.append({"name": name, "ph": "X", "pid": 1, "tid": thread,
+                               "ts": (started - self.origin) * 1e6, "dur": duration * 1e6})
+
+    def frame(self, ticks):
+        if self.overlay:
+            now = time.perf_counter()
+            self.frame_times.append(now)
+            self.tick_times.extend([now] * ticks)
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.surface = None
+        return self.overlay
+
+    @staticmethod
+    def rate(times):
+        return (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0
+
+    def rows(self):
+        # (label, p50, p99) rows; the first two are the rates and the column headings
+        now = time.perf_counter()
+        recent_ticks = sum(1 for t in self.tick_times if now - t < 1.0)
+        rows = [(f"FPS {self.rate(self.frame_times):.1f}   ticks/s {recent_ticks}", "", ""),
+                ("phase", "p50 ms", "p99 ms")]
+        # other threads may add samples meanwhile; dict/deque copies are atomic
+        for name, samples in list(self.samples.items()):
+            ordered = sorted(samples.copy())
+            p50 = ordered[len(ordered) // 2] * 1000
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000
+            rows.append((name, f"{p50:.2f}", f"{p99:.2f}"))
+        return rows
+
+    def draw(self):
+        # Opaque box in the top-right corner, re-rendered 4 times a second; returns its rect
+        now = time.perf_counter()
+        if self.surface is None or now - self.rendered_at > 0.25:
+            debug_font = font("debug")
+            rows = self.rows()
+            height = debug_font.get_linesize()
+            self.surface = pygame.Surface((scale(250), height * len(rows) + scale(8)))
+            self.surface.fill((20, 30, 10))
+            color = (220, 240, 200)
+            for index, (label, p50, p99) in enumerate(rows):
+                y = scale(4) + index * height
+                self.surface.blit(debug_font.render(label, True, color), (scale(6), y))
+                # numbers right-aligned in their columns
+                for text, right in ((p50, scale(180)), (p99, scale(244))):
+                    if text:
+                        number = debug_font.render(text, True, color)
+                        self.surface.blit(number, number.get_rect(topright=(right, y)))
+            self.rendered_at = now
+        rect = self.surface.get_rect(topright=(screen_size_x - scale(6), scale(6)))
+        screen.blit(self.surface, rect)
+        return rect
+
+    def save_trace(self):
+        if self.trace_path is None:
             return
-        if self.new_block:
-            body_copy = self.body[:]
-            body_copy.insert(0, body_copy[0] + self.direction)
-            self.body = body_copy[:]
-            self.new_block = False
+        names = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": thread, "args": {"name": name}}
+                 for thread, name in self.threads.items()]
+        with open(self.trace_path, "w") as file:
+            json.dump({"traceEvents": names + self.trace, "displayTimeUnit": "ms"}, file)
+
+
+# ---------------------- Snake Tiles ---------------------- #
+# Sprites packed into the snake atlas, in atlas order; a tile id is an index here
+TILE_NAMES = (
+    "head_up", "head_down", "head_right", "head_left",
+    "tail_up", "tail_down", "tail_right", "tail_left",
+    "body_vertical", "body_horizontal", "body_tr", "body_tl", "body_br", "body_bl",
+)
+TILE = {name: index for index, name in enumerate(TILE_NAMES)}
+
+# Lookup tables indexed by neighbour side: 0 up, 1 right, 2 down, 3 left (engine DIRECTIONS order)
+HEAD_TILES = [TILE["head_down"], TILE["head_left"], TILE["head_up"], TILE["head_right"]]  # side of the neck
+TAIL_TILES = [TILE["tail_down"], TILE["tail_left"], TILE["tail_up"], TILE["tail_right"]]  # side of the next segment
+BODY_TILES = [[0] * 4 for _ in range(4)]  # [side of one neighbour][side of the other]
+for _sides, _name in (((0, 2), "body_vertical"), ((1, 3), "body_horizontal"), ((3, 0), "body_tl"),
+                      ((3, 2), "body_bl"), ((1, 0), "body_tr"), ((1, 2), "body_br")):
+    BODY_TILES[_sides[0]][_sides[1]] = BODY_TILES[_sides[1]][_sides[0]] = TILE[_name]
+
+
+# ---------------------- Game Classes ---------------------- #
+class SNAKE(SNAKE_CORE):
+    # Movement rules live in SNAKE_CORE; this class adds sprites and sound
+    def __init__(self, skin_index=1):
+        self.skin = skin_index
+        self.reset_graphics()
+        SNAKE_CORE.__init__(self, cell_number)
+
+    def reset(self, cells=None):
+        SNAKE_CORE.reset(self, cells)
+        self.classify_body()
+
+    def classify_body(self):
+        # tile id per occupied cell; only head, neck and tail are reclassified per move
+        n = self.cell_number
+        self.side_of = {-n: 0, 1: 1, n: 2, -1: 3}
+        self.tiles = bytearray(n * n)
+        body = list(self.body)
+        for index in range(len(body)):
+            self.classify(body, index)
+
+    def reset_graphics(self):
+        # Sprites come from the shared registry, so a restart or skin switch reads no files
+        size = (cell_size, cell_size)
+        self.atlas, self.tile_areas = assets.cached((self.skin, "atlas", size), self.build_atlas)
+        self.crunch_sound = assets.sound("crunch.wav")
+
+    def build_atlas(self):
+        # Pack the 14 sprites side by side so the whole snake is drawn with one blits() call
+        size = (cell_size, cell_size)
+        atlas = pygame.Surface((cell_size * len(TILE_NAMES), cell_size), pygame.SRCALPHA)
+        atlas.fill((0, 0, 0, 0))
+        tile_areas = []
+        for index, name in enumerate(TILE_NAMES):
+            area = pygame.Rect(index * cell_size, 0, cell_size, cell_size)
+            # additive blit onto transparent black copies the pixels exactly (no alpha darkening)
+            atlas.blit(assets.image(self.skin, name, size), area, special_flags=pygame.BLEND_RGBA_ADD)
+            tile_areas.append(area)
+        return atlas, tile_areas
+
+    def classify(self, body, index):
+        # Pick the tile for body[index] from the sides its neighbours are on
+        block = body[index]
+        side_of = self.side_of
+        if index == 0:
+            self.tiles[block] = HEAD_TILES[side_of[body[1] - block]]
+        elif index == len(body) - 1:
+            self.tiles[block] = TAIL_TILES[side_of[body[index - 1] - block]]
         else:
-            body_copy = self.body[:-1]
-            body_copy.insert(0, body_copy[0] + self.direction)
-            self.body = body_copy[:]
+            self.tiles[block] = BODY_TILES[side_of[body[index + 1] - block]][side_of[body[index - 1] - block]]
+
+    def move_snake(self):
+        SNAKE_CORE.move_snake(self)
+        # deque ends are O(1) to index, so this costs the same at any length
+        last = len(self.body) - 1
+        for index in (last, 1, 0):
+            self.classify(self.body, index)
 
-    def add_block(self):
-        self.new_block = True
+    def draw_snake(self):
+        # Culled: walk whichever is smaller, the body or the cells in view
+        self.draw_cells(self.body if len(self.body) <= camera.area else camera.cells())
+
+    def draw_tile(self, tile, pos):
+        screen.blit(self.atlas, pos, self.tile_areas[tile])
+
+    def draw_cells(self, cells):
+        # One batched blit from the atlas for every snake segment in view found in `cells`
+        n = self.cell_number
+        occupied = self.grid.occupied
+        tiles = self.tiles
+        areas = self.tile_areas
+        atlas = self.atlas
+        x0, y0, cols, rows = camera.x0, camera.y0, camera.cols, camera.rows
+        blits = []
+        for cell in cells:
+            if occupied[cell]:
+                y, x = divmod(cell, n)
+                x -= x0
+                y -= y0
+                if 0 <= x < cols and 0 <= y < rows:
+                    blits.append((atlas, (x * cell_size, y * cell_size), areas[tiles[cell]]))
+        screen.blits(blits, doreturn=False)
 
     def play_crunch_sound(self):
         if self.crunch_sound:
             self.crunch_sound.play()
 
 
-class FRUIT:
-    def __init__(self, skin_index=1):
+class FRUIT(FRUIT_CORE):
+    def __init__(self, grid, rng, skin_index=1):
         self.skin = skin_index
-        self.randomize()
+        FRUIT_CORE.__init__(self, grid, cell_number, rng)
 
     def draw_fruit(self):
-        fruit_rect = pygame.Rect(int(self.pos.x * cell_size), int(self.pos.y * cell_size), cell_size, cell_size)
-        if apple_image:
-            screen.blit(apple_image, fruit_rect)
+        if self.cell is None or not camera.contains(self.cell):
+            return
+        fruit_rect = cell_rect(self.cell)
+        apple = apple_image()
+        if apple:
+            screen.blit(apple, fruit_rect)
         else:
             pygame.draw.rect(screen, (200, 30, 30), fruit_rect)
 
-    def randomize(self):
-        # ensure fruit spawns within grid
-        self.x = random.randint(0, cell_number - 1)
-        self.y = random.randint(0, cell_number - 1)
-        self.pos = Vector2(self.x, self.y)
-
 
-class MAIN:
-    def __init__(self):
-        self.snake = SNAKE(skin_index=current_skin)
-        self.fruit = FRUIT(skin_index=current_skin)
+class MAIN(GAME_CORE):
+    # Rules (update/check_collision/check_fail/game_over) come from GAME_CORE
+    def __init__(self, seed=None, record_dir=None, playback=None, speed=1.0, autopilot=False,
+                 instant_turns=False):
+        self.skin_index = current_skin
+        # no snake yet: sprites are only needed once the first game starts
+        GAME_CORE.__init__(self, cell_number, start=False, seed=seed)
         self.read_high_score()
-        self.direction_changed = False
         self.state = "MAIN_MENU"  # MAIN_MENU, PLAYING, PAUSED, GAME_OVER
         self.menu_index = 0
         self.difficulty_index = 1  # 0: Easy, 1: Normal, 2: Hard
-        self.skin_index = current_skin
-        self.last_score = 0
+
+        # Replays: every game is recorded into record_dir, or a recorded game is played back
+        self.record_dir = record_dir
+        self.recording = None
+        self.playback = playback
+        self.player = None
+        self.speed = speed
+        self.pilot = AUTOPILOT(self.cell_number) if autopilot else None
+
+        # Input: turns wait in GAME_CORE.turns; with instant_turns a turn can also step at once
+        self.instant_turns = instant_turns
+        self.shown_turns = []  # input timestamps of turns applied since the last frame
+
+        # Rendering: static background is drawn once; ticks only mark the cells they touch
+        self.background = None
+        self.dirty = set()
+        self.full_redraw = True
+        self.drawn_state = None
+        self.drawn_score = None
+        self.score_rect = pygame.Rect(0, 0, 0, 0)
+        self.high_score_rect = pygame.Rect(0, 0, 0, 0)
+        self.motion_cells = set()  # cells touched by the last interpolated frame
+        self.overlays = {}  # alpha -> full-screen translucent surface, built once
+
+    def new_snake(self):
+        return SNAKE(skin_index=self.skin_index)
+
+    def new_fruit(self):
+        return FRUIT(self.snake.grid, self.rng, skin_index=self.skin_index)
 
     def read_high_score(self):
-        try:
-            with open("highscore.txt", "r") as file:
-                self.high_score = int(file.read())
-        except:
-            self.high_score = 0
-
-    def write_high_score(self):
-        with open("highscore.txt", "w") as file:
-            file.write(str(self.high_score))
-
-    def start_game(self):
-        self.snake = SNAKE(skin_index=self.skin_index)
-        self.fruit = FRUIT(skin_index=self.skin_index)
-        self.direction_changed = False
-        self.snake.reset()
-        self.fruit.randomize()
-        self.state = "PLAYING"
-        # Immediately set a safe direction to the right to avoid stuck state
-        self.snake.direction = Vector2(1, 0)
+        self.high_score = high_scores.value
+
+    def write_high_score(self, urgent=False):
+        # Queued for the background writer; never blocks the frame loop
+        high_scores.set(self.high_score, urgent)
+
+    def save_recording(self):
+        # A replay is a few hundred bytes, so it is written once, at game over
+        self.recording.finish(self)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.game_seed}.hpr"
+        self.recording.save(os.path.join(self.record_dir, name))
+        self.recording = None
+
+    def start_game(self, seed=None):
+        if self.playback is not None:
+            seed = self.playback.seed
+            self.difficulty_index = self.playback.difficulty_index
+            self.player = REPLAY_PLAYER(self.playback)
+        GAME_CORE.start_game(self, seed)
+        camera.follow(self.snake.body[0], center=True)
+        self.full_redraw = True
+        if self.record_dir is not None:
+            self.recording = REPLAY(self.game_seed, self.cell_number, self.difficulty_index)
+        self.shown_turns.clear()
         # Reset timer according to difficulty
         self.apply_difficulty_timer()
+        scheduler.reset()
 
     def apply_difficulty_timer(self):
         # Difficulty determines game update speed (ms)
-        if self.difficulty_index == 0:  # Easy
-            interval = 200
-        elif self.difficulty_index == 1:  # Normal
-            interval = 150
-        else:  # Hard
-            interval = 100
-        pygame.time.set_timer(SCREEN_UPDATE, interval)
+        scheduler.set_step(TICK_MS[self.difficulty_index] / self.speed)
+
+    def turn(self, direction):
+        # Player input; ignored while a replay or the autopilot is steering
+        if self.player is not None or self.pilot is not None:
+            return False
+        if not self.queue_turn(direction, profiler.start()):
+            return False
+        # Instant mode: a turn into an empty queue steps right away, unless the last tick was
+        # under half an interval ago (so mashing keys can't outrun the difficulty's pace)
+        if self.instant_turns and len(self.turns) == 1 and scheduler.tick_progress() >= 0.5:
+            self.update()
+            scheduler.reset()
+        return True
+
+    def apply_turn(self, direction, stamp=None):
+        # Turns are recorded against the tick they take effect on
+        previous = self.snake.direction
+        if not GAME_CORE.apply_turn(self, direction):
+            return False
+        if self.recording is not None and direction != previous:
+            self.recording.record(self.ticks, direction)
+        if stamp is not None:
+            self.shown_turns.append(stamp)
+        return True
+
+    def report_latency(self):
+        # Called once the frame is on screen: input-to-visual time of each turn it shows
+        for stamp in self.shown_turns:
+            profiler.record("input latency", stamp)
+        self.shown_turns.clear()
 
     def update(self):
-        # Called on SCREEN_UPDATE timer
-        self.direction_changed = False
-        if self.state == "PLAYING":
-            self.snake.move_snake()
-            self.check_collision()
-            self.check_fail()
+        # Called once per fixed scheduler tick
+        if self.state != "PLAYING":
+            return
+        if self.player is not None:
+            self.player.apply(self)
+        elif self.pilot is not None:
+            self.apply_turn(self.pilot.choose(self))
+        body = self.snake.body
+        old_tail, old_fruit = body[-1], self.fruit.cell
+        if not camera.scrolls:
+            GAME_CORE.update(self)
+            # old tail, new head, neck, new tail and both fruit cells can change per tick
+            self.dirty.update((old_tail, old_fruit, body[0], body[1], body[-1], self.fruit.cell))
+            self.dirty.discard(None)
+            return
+        old_marker = self.fruit_marker()
+        GAME_CORE.update(self)
+        if camera.follow(body[0]):
+            self.full_redraw = True  # a scrolled view costs one window-sized redraw
+            return
+        # the same cells plus the edge markers of an off-screen fruit
+        self.dirty.update((old_tail, old_fruit, old_marker, body[0], body[1], body[-1],
+                           self.fruit.cell, self.fruit_marker()))
+        self.dirty.discard(None)
+
+    def rescale(self):
+        # New cell size: sprites come from the registry's per-size cache, window-sized
+        # surfaces are rebuilt on the next frame
+        self.background = None
+        self.overlays.clear()
+        if self.snake is not None:
+            self.snake.reset_graphics()
+        self.full_redraw = True
+
+    def restore(self, state):
+        # Rollback: the rules state comes back, the picture is rebuilt from it. Turns
+        # recorded after the restored tick never happened; a replay resumes from it.
+        GAME_CORE.restore(self, state)
+        self.snake.classify_body()
+        if self.recording is not None:
+            self.recording.rewind(state.ticks)
+        if self.player is not None:
+            self.player.seek(state.ticks)
+        self.shown_turns.clear()
+        camera.follow(self.snake.body[0], center=True)
+        self.dirty.clear()
+        self.full_redraw = True
+
+    def fruit_marker(self):
+        # Edge cell pointing at a fruit outside the view (None while it is in view)
+        cell = self.fruit.cell
+        if cell is None or camera.contains(cell):
+            return None
+        return camera.clamp(cell)
+
+    def draw_fruit_marker(self):
+        marker = self.fruit_marker()
+        if marker is not None:
+            pygame.draw.circle(screen, (200, 30, 30), cell_rect(marker).center, max(2, cell_size // 5))
 
     def draw_elements(self):
         self.draw_grass()
         if self.state in ("PLAYING", "PAUSED", "GAME_OVER"):
             self.fruit.draw_fruit()
+            self.draw_fruit_marker()
             self.snake.draw_snake()
             self.draw_score()
 
-    def check_collision(self):
-        if self.fruit.pos == self.snake.body[0]:
-            self.fruit.randomize()
-            self.snake.add_block()
-            self.snake.play_crunch_sound()
-
-        # ensure fruit is not on snake
-        for block in self.snake.body[1:]:
-            if block == self.fruit.pos:
-                self.fruit.randomize()
-
-    def check_fail(self):
-        # border collision
-        head = self.snake.body[0]
-        if not 0 <= head.x < cell_number or not 0 <= head.y < cell_number:
-            self.game_over()
-        # self collision
-        for block in self.snake.body[1:]:
-            if block == head:
-                self.game_over()
+    def render(self, alpha=None):
+        # Draws what changed and returns the rects to pass to pygame.display.update.
+        # `alpha` (0..1 progress to the next tick) enables interpolated snake motion.
+        if self.full_redraw or self.state != self.drawn_state:
+            return self.draw_frame()
+        if self.state == "PLAYING" and (self.dirty or alpha is not None):
+            return self.draw_dirty(alpha)
+        return []
+
+    def draw_frame(self):
+        if self.state == "MAIN_MENU":
+            self.draw_grass()
+            self.draw_main_menu()
+        else:
+            self.draw_elements()
+            if self.state == "PAUSED":
+                self.draw_pause()
+            elif self.state == "GAME_OVER":
+                self.draw_game_over()
+        self.full_redraw = False
+        self.drawn_state = self.state
+        self.dirty.clear()
+        self.motion_cells = set()
+        return [screen.get_rect()]
+
+    def draw_dirty(self, alpha=None):
+        # Only cells touched since the last frame are redrawn, over the cached background
+        cells = self.dirty
+        if alpha is not None:
+            # sprites drawn between cells last frame must be erased too
+            moving = self.moving_cells()
+            cells = cells | moving | self.motion_cells
+            self.motion_cells = moving
+        if camera.scrolls:
+            cells = [cell for cell in cells if camera.contains(cell)]
+        rects = [cell_rect(cell) for cell in cells]
+        # HUD text is drawn over the board; the cells beneath it can't be restored piecemeal
+        if self.update_high_score() or self.high_score_rect.collidelist(rects) != -1:
+            return self.draw_frame()
+
+        shift = camera.shift
+        for rect in rects:
+            screen.blit(self.background, rect, rect.move(shift, 0))
+        if self.fruit.cell in cells:
+            self.fruit.draw_fruit()
+        marker = self.fruit_marker()
+        if marker is not None and marker in cells:
+            self.draw_fruit_marker()
+        if alpha is None:
+            self.snake.draw_cells(cells)
+        else:
+            self.draw_motion(cells, alpha)
+        self.dirty.clear()
+
+        if self.score != self.drawn_score or self.score_rect.collidelist(rects) != -1:
+            old_rect = self.score_rect
+            if not self.draw_score_box().contains(old_rect):
+                return self.draw_frame()
+            rects.append(self.score_rect)
+        return rects
+
+    def moving_cells(self):
+        # Cells an interpolated head/tail can overlap: head, neck, tail, the cell ahead of
+        # the tail and the cell the head is moving into
+        body = self.snake.body
+        cells = {body[0], body[1], body[-1], body[-2]}
+        ahead = self.cell_ahead()
+        if ahead is not None:
+            cells.add(ahead)
+        return cells
+
+    def cell_ahead(self):
+        x, y = cell_coords(self.snake.body[0], self.cell_number)
+        x += self.snake.direction[0]
+        y += self.snake.direction[1]
+        if self.snake.crashed or not 0 <= x < self.cell_number or not 0 <= y < self.cell_number:
+            return None
+        return cell_index(x, y, self.cell_number)
+
+    def draw_motion(self, cells, alpha):
+        # The board only changes on ticks; here the head slides towards the cell ahead
+        # and the tail towards the segment in front of it by `alpha` of a cell
+        snake = self.snake
+        body = snake.body
+        head, tail = body[0], body[-1]
+
+        snake.draw_cells([cell for cell in cells if cell != head and cell != tail])
+        tail_x, tail_y = cell_coords(tail, self.cell_number)
+        if snake.new_block:
+            snake.draw_cells((tail,))  # growing: the tail stays put this tick
+        else:
+            # drawn over the segment ahead so the rounded end stays visible
+            next_x, next_y = cell_coords(body[-2], self.cell_number)
+            pos = camera.screen_pos(tail_x + (next_x - tail_x) * alpha, tail_y + (next_y - tail_y) * alpha)
+            snake.draw_tile(snake.tiles[tail], pos)
+
+        ahead = self.cell_ahead()
+        if ahead is None:
+            snake.draw_cells((head,))
+            return
+        # the head's cell already shows the bend it becomes next tick
+        side = DIRECTIONS.index(snake.direction)
+        head_x, head_y = cell_coords(head, self.cell_number)
+        snake.draw_tile(BODY_TILES[snake.side_of[body[1] - head]][side], camera.screen_pos(head_x, head_y))
+        dx, dy = snake.direction
+        pos = camera.screen_pos(head_x + dx * alpha, head_y + dy * alpha)
+        snake.draw_tile(HEAD_TILES[(side + 2) % 4], pos)
 
     def game_over(self):
-        self.last_score = len(self.snake.body) - 3
+        GAME_CORE.game_over(self)
+        if self.recording is not None:
+            self.save_recording()
+        if self.pilot is not None:
+            print(f"autopilot: score {self.last_score}, {self.pilot.rate:,.0f} decisions/s")
+        if not self.counts_score():
+            return
         if self.last_score > self.high_score:
             self.high_score = self.last_score
-            self.write_high_score()
-        self.state = "GAME_OVER"
-
-    def draw_grass(self):
+        # a record set during play is still pending in the debounce window
+        if self.high_score != high_scores.saved:
+            self.write_high_score(urgent=True)
+
+    def build_background(self):
+        # The checkerboard never changes, so one window-sized tile (plus a column, for odd
+        # camera offsets) is rendered once per cell size and serves every part of the board
+        key = (None, f"background {camera.cols}x{camera.rows}", (cell_size, cell_size))
+        self.background = assets.cached(key, self.render_background)
+
+    def render_background(self):
+        background = pygame.Surface((screen_size_x + cell_size, screen_size_y)).convert()
+        background.fill((175, 215, 70))
         grass_color = (167, 209, 61)
-        for row in range(cell_number):
-            for col in range(cell_number):
+        for row in range(camera.rows):
+            for col in range(camera.cols + 1):
                 if (row + col) % 2 == 0:
                     grass_rect = pygame.Rect(col * cell_size, row * cell_size, cell_size, cell_size)
-                    pygame.draw.rect(screen, grass_color, grass_rect)
+                    pygame.draw.rect(background, grass_color, grass_rect)
+        return background
 
-    def draw_score(self):
-        score = len(self.snake.body) - 3
-        # update highscore while playing
-        if score > self.high_score:
-            self.high_score = score
+    def draw_grass(self):
+        if self.background is None:
+            self.build_background()
+        screen.blit(self.background, (0, 0), pygame.Rect(camera.shift, 0, screen_size_x, screen_size_y))
+
+    def counts_score(self):
+        # replays and autopilot games never touch the high score
+        return self.playback is None and self.pilot is None
+
+    def update_high_score(self):
+        # update highscore while playing; True when it changed
+        if self.score > self.high_score and self.counts_score():
+            self.high_score = self.score
             self.write_high_score()
+            return True
+        return False
+
+    def draw_score(self):
+        self.update_high_score()
+        self.draw_score_box()
 
-        # Current score (bottom-right)
+        # High Score (top-left)
+        high_score_text = f"High Score: {self.high_score}"
+        high_score_surface = text_cache.render(font("game"), high_score_text, (56, 74, 12))
+        self.high_score_rect = high_score_surface.get_rect(topleft=(scale(10), scale(10)))
+        screen.blit(high_score_surface, self.high_score_rect)
+
+    def draw_score_box(self):
+        # Current score (bottom-right); the box is opaque so it can be redrawn on its own
+        score = self.score
         score_text = str(score)
-        score_surface = game_font.render(score_text, True, (56, 74, 12))
-        score_x = int(cell_size * cell_number - 60)
-        score_y = int(cell_size * cell_number - 40)
+        score_surface = text_cache.render(font("game"), score_text, (56, 74, 12))
+        score_x = screen_size_x - scale(60)
+        score_y = screen_size_y - scale(40)
         score_rect = score_surface.get_rect(center=(score_x, score_y))
-        apple_rect = apple_image.get_rect(midright=(score_rect.left, score_rect.centery)) if apple_image else pygame.Rect(score_rect.left - 36, score_rect.top, 32, 32)
-        bg_rect = pygame.Rect(apple_rect.left, apple_rect.top, (apple_rect.width if apple_image else 32) + score_rect.width + 6, apple_rect.height)
+        apple = apple_image()
+        apple_rect = apple.get_rect(midright=(score_rect.left, score_rect.centery)) if apple else pygame.Rect(score_rect.left - scale(36), score_rect.top, scale(32), scale(32))
+        bg_rect = pygame.Rect(apple_rect.left, apple_rect.top, (apple_rect.width if apple else scale(32)) + score_rect.width + scale(6), apple_rect.height)
 
         pygame.draw.rect(screen, (167, 209, 61), bg_rect)
         screen.blit(score_surface, score_rect)
-        if apple_image:
-            screen.blit(apple_image, apple_rect)
+        if apple:
+            screen.blit(apple, apple_rect)
         pygame.draw.rect(screen, (56, 74, 12), bg_rect, 2)
-
-        # High Score (top-left)
-        high_score_text = f"High Score: {self.high_score}"
-        high_score_surface = game_font.render(high_score_text, True, (56, 74, 12))
-        high_score_rect = high_score_surface.get_rect(topleft=(10, 10))
-        screen.blit(high_score_surface, high_score_rect)
+        self.score_rect = bg_rect
+        self.drawn_score = score
+        return bg_rect
 
     # ---------- Menus & overlays ---------- #
     def draw_main_menu(self):
-        title = title_font.render("HUNGRY PYTHON", True, (50, 50, 50))
-        title_rect = title.get_rect(center=(screen_size_x // 2, 230))
+        title = text_cache.render(font("title"), "HUNGRY PYTHON", (50, 50, 50))
+        title_rect = title.get_rect(center=(screen_size_x // 2, scale(230)))
         screen.blit(title, title_rect)
 
         menu_items = ["Start Game", f"Difficulty: {['Easy','Normal','Hard'][self.difficulty_index]}", "Quit"]
         for i, item in enumerate(menu_items):
             color = (10, 80, 10) if i == self.menu_index else (50, 50, 50)
-            surf = menu_font.render(item, True, color)
-            rect = surf.get_rect(center=(screen_size_x // 2, 310 + i * 50))
+            surf = text_cache.render(font("menu"), item, color)
+            rect = surf.get_rect(center=(screen_size_x // 2, scale(310 + i * 50)))
             screen.blit(surf, rect)
 
 
 
+    def overlay(self, alpha):
+        if alpha not in self.overlays:
+            surf = pygame.Surface((screen_size_x, screen_size_y), pygame.SRCALPHA)
+            surf.fill((0, 0, 0, alpha))
+            self.overlays[alpha] = surf
+        return self.overlays[alpha]
+
     def draw_pause(self):
-        overlay = pygame.Surface((screen_size_x, screen_size_y), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 120))
-        screen.blit(overlay, (0, 0))
-        pause_text = title_font.render("PAUSED", True, (255, 255, 255))
-        rect = pause_text.get_rect(center=(screen_size_x // 2, screen_size_y // 2 - 20))
+        screen.blit(self.overlay(120), (0, 0))
+        pause_text = text_cache.render(font("title"), "PAUSED", (255, 255, 255))
+        rect = pause_text.get_rect(center=(screen_size_x // 2, screen_size_y // 2 - scale(20)))
         screen.blit(pause_text, rect)
-        info = small_font.render("Press P to resume or M for menu", True, (230, 230, 230))
-        screen.blit(info, info.get_rect(center=(screen_size_x // 2, screen_size_y // 2 + 30)))
+        info = text_cache.render(font("small"), "Press P to resume or M for menu", (230, 230, 230))
+        screen.blit(info, info.get_rect(center=(screen_size_x // 2, screen_size_y // 2 + scale(30))))
 
     def draw_game_over(self):
-        overlay = pygame.Surface((screen_size_x, screen_size_y), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 150))
-        screen.blit(overlay, (0, 0))
-        go_text = title_font.render("GAME OVER", True, (255, 200, 80))
-        screen.blit(go_text, go_text.get_rect(center=(screen_size_x // 2, 200)))
-        score_text = menu_font.render(f"Score: {self.last_score}", True, (255, 255, 255))
-        screen.blit(score_text, score_text.get_rect(center=(screen_size_x // 2, 280)))
-        hs_text = menu_font.render(f"High Score: {self.high_score}", True, (200, 200, 200))
-        screen.blit(hs_text, hs_text.get_rect(center=(screen_size_x // 2, 320)))
+        screen.blit(self.overlay(150), (0, 0))
+        go_text = text_cache.render(font("title"), "YOU WIN" if self.won else "GAME OVER", (255, 200, 80))
+        screen.blit(go_text, go_text.get_rect(center=(screen_size_x // 2, scale(200))))
+        score_text = text_cache.render(font("menu"), f"Score: {self.last_score}", (255, 255, 255))
+        screen.blit(score_text, score_text.get_rect(center=(screen_size_x // 2, scale(280))))
+        hs_text = text_cache.render(font("menu"), f"High Score: {self.high_score}", (200, 200, 200))
+        screen.blit(hs_text, hs_text.get_rect(center=(screen_size_x // 2, scale(320))))
 
         # options
-        opt1 = small_font.render("Press ENTER to play again", True, (220, 220, 220))
-        opt2 = small_font.render("Press M to return to menu", True, (220, 220, 220))
-        screen.blit(opt1, opt1.get_rect(center=(screen_size_x // 2, 470)))
-        screen.blit(opt2, opt2.get_rect(center=(screen_size_x // 2, 510)))
+        opt1 = text_cache.render(font("small"), "Press ENTER to play again", (220, 220, 220))
+        opt2 = text_cache.render(font("small"), "Press M to return to menu", (220, 220, 220))
+        screen.blit(opt1, opt1.get_rect(center=(screen_size_x // 2, scale(470))))
+        screen.blit(opt2, opt2.get_rect(center=(screen_size_x // 2, scale(510))))
 
 
 # ---------------------- Pygame Setup ---------------------- #
-pygame.mixer.pre_init(44100, -16, 2, 512)
-pygame.init()
+# Default skin
+current_skin = 1
 
-cell_size = 34
-cell_number = 17
-screen_size_x = cell_number * cell_size
-screen_size_y = cell_number * cell_size
+cell_size = BASE_CELL_SIZE
+cell_number = 17  # board side, in cells
+view_cells = 17  # window side, in cells; larger boards scroll under a camera
+screen_size_x = min(cell_number, view_cells) * cell_size
+screen_size_y = min(cell_number, view_cells) * cell_size
 
-screen = pygame.display.set_mode((screen_size_x, screen_size_y))
-pygame.display.set_caption("Snake - Upgraded")
-clock = pygame.time.Clock()
+ARROW_DIRECTIONS = {pygame.K_UP: UP, pygame.K_RIGHT: RIGHT, pygame.K_DOWN: DOWN, pygame.K_LEFT: LEFT}
 
-# Fonts
-game_font = pygame.font.Font(str(FONT_DIR / "PoetsenOne-Regular.ttf") if (FONT_DIR / "PoetsenOne-Regular.ttf").exists() else None, 25)
-menu_font = pygame.font.Font(str(FONT_DIR / "PoetsenOne-Regular.ttf") if (FONT_DIR / "PoetsenOne-Regular.ttf").exists() else None, 32)
-title_font = pygame.font.Font(str(FONT_DIR / "PoetsenOne-Regular.ttf") if (FONT_DIR / "PoetsenOne-Regular.ttf").exists() else None, 64)
-small_font = pygame.font.Font(str(FONT_DIR / "PoetsenOne-Regular.ttf") if (FONT_DIR / "PoetsenOne-Regular.ttf").exists() else None, 18)
+# Default difficulty (Normal) tick interval in ms
+default_interval = 150
 
-# Load apple image (try skin2 then default)
-apple_image = load_image_or_fallback([ASSET_DIR / "apple.png", ASSET_DIR / "skin2_apple.png"], (cell_size, cell_size))
+# The TTF bytes, read by the first font() call
+font_bytes = None
 
-# Sounds
-menu_select_sound = load_sound_or_none(SOUND_DIR / "menu_select.wav")
-# (crunch sound is loaded per snake instance)
+# Rendered text is shared by the HUD, menus and overlays
+text_cache = TEXT_CACHE()
 
-# Timer event
-SCREEN_UPDATE = pygame.USEREVENT
+# Shared sprites/sounds, filled on demand
+assets = ASSET_REGISTRY()
 
-# Default skin and difficulty
-current_skin = 1
-default_interval = 150
-pygame.time.set_timer(SCREEN_UPDATE, default_interval)
+# Frame-phase timings: F3 overlay, --trace file
+profiler = PROFILER()
 
-# Create main game manager
-main_game = MAIN()
+# Created by setup(); importing this module opens no window
+screen = None
+high_scores = None
+scheduler = None
+camera = None
+windowed_size = None  # window size to return to when leaving fullscreen
 
-# ---------------------- Main Game Loop ---------------------- #
-while True:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-
-        # Timer-driven update
-        if event.type == SCREEN_UPDATE:
-            main_game.update()
 
-        # Key handling: menus, playing, pause
-        if event.type == pygame.KEYDOWN:
-            # Global keys
-            if event.key == pygame.K_ESCAPE:
-                pygame.quit()
-                sys.exit()
-
-            # --- MAIN MENU controls ---
-            if main_game.state == "MAIN_MENU":
-                if event.key == pygame.K_DOWN:
-                    main_game.menu_index = (main_game.menu_index + 1) % 3
-                elif event.key == pygame.K_UP:
-                    main_game.menu_index = (main_game.menu_index - 1) % 3
-                elif event.key == pygame.K_RETURN:
-                    sel = main_game.menu_index
-                    if sel == 0:
-                        main_game.start_game()
-                    elif sel == 1:
-                        main_game.difficulty_index = (main_game.difficulty_index + 1) % 3
-                        main_game.apply_difficulty_timer()
-                    elif sel == 2:
-                        pygame.quit()
-                        sys.exit()
-                # Allow left/right to change options inline
-                elif event.key == pygame.K_LEFT or event.key == pygame.K_RIGHT:
-                    if main_game.menu_index == 1:  # Difficulty
-                        if event.key == pygame.K_RIGHT:
-                            main_game.difficulty_index = (main_game.difficulty_index + 1) % 3
-                        else:
-                            main_game.difficulty_index = (main_game.difficulty_index - 1) % 3
-                        main_game.apply_difficulty_timer()
-                        if menu_select_sound: menu_select_sound.play()
-                    elif main_game.menu_index == 2:  # Skin
-                        main_game.skin_index = 2 if main_game.skin_index == 1 else 1
-                        if menu_select_sound: menu_select_sound.play()
-
-            # --- PLAYING controls ---
-            elif main_game.state == "PLAYING":
-                # Prevent more than one direction change per update/frame
-                if not main_game.direction_changed:
-                    current_x = main_game.snake.direction.x
-                    current_y = main_game.snake.direction.y
-
-                    if event.key == pygame.K_UP and current_y != 1:
-                        main_game.snake.direction = Vector2(0, -1)
-                        main_game.direction_changed = True
-                    elif event.key == pygame.K_RIGHT and current_x != -1:
-                        main_game.snake.direction = Vector2(1, 0)
-                        main_game.direction_changed = True
-                    elif event.key == pygame.K_DOWN and current_y != -1:
-                        main_game.snake.direction = Vector2(0, 1)
-                        main_game.direction_changed = True
-                    elif event.key == pygame.K_LEFT and current_x != 1:
-                        main_game.snake.direction = Vector2(-1, 0)
-                        main_game.direction_changed = True
-
-                # Pause
-                if event.key == pygame.K_p:
-                    main_game.state = "PAUSED"
-                    if menu_select_sound: menu_select_sound.play()
-
-            # --- PAUSED controls ---
-            elif main_game.state == "PAUSED":
-                if event.key == pygame.K_p:
-                    main_game.state = "PLAYING"
-                    if menu_select_sound: menu_select_sound.play()
-                if event.key == pygame.K_m:
-                    main_game.state = "MAIN_MENU"
-                    if menu_select_sound: menu_select_sound.play()
-
-            # --- GAME OVER controls ---
-            elif main_game.state == "GAME_OVER":
-                if event.key == pygame.K_RETURN or event.key == pygame.K_KP_ENTER:
-                    # Play again with same settings
-                    if menu_select_sound: menu_select_sound.play()
-                    main_game.start_game()
-                if event.key == pygame.K_m:
-                    main_game.state = "MAIN_MENU"
-                    if menu_select_sound: menu_select_sound.play()
-
-    # ----- Drawing -----
-    screen.fill((175, 215, 70))
-
-    if main_game.state == "MAIN_MENU":
-        main_game.draw_grass()
-        main_game.draw_main_menu()
+def hidpi_scale():
+    """
+    Opt in to real pixels on Windows HiDPI displays (instead of a blurry 96 DPI window
+    stretched by the OS) and return the display scale to size the first window by.
+    Other platforms already hand pygame a surface in the pixels it will show.
+    """
+    if sys.platform != "win32":
+        return 1.0
+    try:
+        import ctypes
+        ctypes.windll.shcore.SetProcessDpiAwareness(2)  # per-monitor aware
+        return ctypes.windll.user32.GetDpiForSystem() / 96
+    except (AttributeError, OSError):
+        return 1.0
+
+
+def setup(fps=60, smooth=False, board=None, view=None, cell_px=None, high_score_file="highscore.txt",
+          fullscreen=False, sprite_cache=None, **game_options):
+    """
+    Open the window and create the shared services, returning a MAIN at the menu.
+    Only the display and font modules are initialized; the mixer starts with the
+    first sound that exists and game sprites are loaded after the first frame.
+    `board`, `view` and `cell_px` override the 17x17 board, the 17x17-cell window
+    and the 34 px cells (by default scaled for HiDPI and capped to the desktop).
+    `sprite_cache` is a directory for pre-scaled sprites shared between launches.
+    """
+    global high_scores, scheduler, camera, cell_number, view_cells, cell_size
+    if board is not None:
+        cell_number = board
+    if view is not None:
+        view_cells = view
+    camera = CAMERA(cell_number, view_cells)
+    dpi_scale = hidpi_scale()
+    pygame.display.init()
+    pygame.font.init()
+    if cell_px is not None:
+        cell_size = cell_px
+    else:
+        desktop_height = pygame.display.get_desktop_sizes()[0][1]
+        cell_size = max(MIN_CELL_SIZE, min(round(BASE_CELL_SIZE * dpi_scale), desktop_height * 9 // 10 // camera.rows))
+    assets.disk_dir = Path(sprite_cache) if sprite_cache else None
+    if fullscreen:
+        pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
     else:
-        main_game.draw_elements()
-        if main_game.state == "PAUSED":
-            main_game.draw_pause()
-        elif main_game.state == "GAME_OVER":
-            main_game.draw_game_over()
-
-    pygame.display.update()
-    clock.tick(60)
\ No newline at end of file
+        pygame.display.set_mode((camera.cols * cell_size, camera.rows * cell_size), pygame.RESIZABLE)
+    pygame.display.set_caption("Snake - Upgraded")
+    fit_window()
+
+    # High score persistence runs off the render path
+    high_scores = HIGH_SCORE_STORE(high_score_file)
+    scheduler = SCHEDULER(default_interval, max_fps=fps, interpolate=smooth)
+    return MAIN(**game_options)
+
+
+def fit_window(main_game=None):
+    """
+    Size cells to the window: the largest cell size at which the view fits, with the
+    board centred and the rest of the window letterboxed. `screen` is the board's
+    subsurface, so all drawing code works in board pixels.
+    """
+    global screen, cell_size, screen_size_x, screen_size_y
+    display = pygame.display.get_surface()
+    width, height = display.get_size()
+    size = max(MIN_CELL_SIZE, min(width // camera.cols, height // camera.rows))
+    if size * camera.cols > width or size * camera.rows > height:
+        # smaller than the smallest board: grow the window instead
+        width, height = max(width, size * camera.cols), max(height, size * camera.rows)
+        display = pygame.display.set_mode((width, height), pygame.RESIZABLE)
+    cell_size = size
+    screen_size_x = camera.cols * cell_size
+    screen_size_y = camera.rows * cell_size
+    area = pygame.Rect(0, 0, screen_size_x, screen_size_y)
+    area.center = display.get_rect().center
+    display.fill((56, 74, 12))
+    screen = display.subsurface(area)
+    assets.use_size((cell_size, cell_size))
+    profiler.surface = None
+    if main_game is not None:
+        main_game.rescale()
+    pygame.display.flip()
+
+
+def toggle_fullscreen(main_game):
+    global windowed_size
+    display = pygame.display.get_surface()
+    if display.get_flags() & pygame.FULLSCREEN:
+        pygame.display.set_mode(windowed_size or (screen_size_x, screen_size_y), pygame.RESIZABLE)
+    else:
+        windowed_size = display.get_size()
+        pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    fit_window(main_game)
+
+
+def quit_game():
+    if high_scores is not None:
+        high_scores.close()
+    profiler.save_trace()
+    pygame.quit()
+    sys.exit()
+
+
+# ---------------------- Main Game Loop ---------------------- #
+def run(main_game, startup_time=False):
+    first_frame = True
+    while True:
+        started = profiler.start()
+        events = scheduler.wait_events(main_game.state == "PLAYING")
+        profiler.record("wait", started)
+        started = profiler.start()
+        resized = False
+        for event in events:
+            if event.type == pygame.QUIT:
+                quit_game()
+
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                main_game.full_redraw = True
+            if event.type == pygame.VIDEORESIZE:
+                resized = True  # a drag sends many; the window is refitted once per frame
+
+            # Key handling: menus, playing, pause
+            if event.type == pygame.KEYDOWN:
+                # Global keys
+                if event.key == pygame.K_ESCAPE:
+                    quit_game()
+                if event.key == pygame.K_F3:
+                    if not profiler.toggle_overlay():
+                        main_game.full_redraw = True  # uncover the board under the overlay
+                if event.key == pygame.K_F11:
+                    toggle_fullscreen(main_game)
+                    resized = False
+
+                # --- MAIN MENU controls ---
+                if main_game.state == "MAIN_MENU":
+                    if event.key == pygame.K_DOWN:
+                        main_game.menu_index = (main_game.menu_index + 1) % 3
+                    elif event.key == pygame.K_UP:
+                        main_game.menu_index = (main_game.menu_index - 1) % 3
+                    elif event.key == pygame.K_RETURN:
+                        sel = main_game.menu_index
+                        if sel == 0:
+                            main_game.start_game()
+                        elif sel == 1:
+                            main_game.difficulty_index = (main_game.difficulty_index + 1) % 3
+                            main_game.apply_difficulty_timer()
+                        elif sel == 2:
+                            quit_game()
+                    # Allow left/right to change options inline
+                    elif event.key == pygame.K_LEFT or event.key == pygame.K_RIGHT:
+                        if main_game.menu_index == 1:  # Difficulty
+                            if event.key == pygame.K_RIGHT:
+                                main_game.difficulty_index = (main_game.difficulty_index + 1) % 3
+                            else:
+                                main_game.difficulty_index = (main_game.difficulty_index - 1) % 3
+                            main_game.apply_difficulty_timer()
+                            play_sound("menu_select.wav")
+                        elif main_game.menu_index == 2:  # Skin
+                            main_game.skin_index = 2 if main_game.skin_index == 1 else 1
+                            play_sound("menu_select.wav")
+
+                # --- PLAYING controls ---
+                elif main_game.state == "PLAYING":
+                    # Queued and applied one per tick, so quick corner turns aren't lost
+                    if event.key in ARROW_DIRECTIONS:
+                        main_game.turn(ARROW_DIRECTIONS[event.key])
+
+                    # Pause
+                    if event.key == pygame.K_p:
+                        main_game.state = "PAUSED"
+                        play_sound("menu_select.wav")
+
+                # --- PAUSED controls ---
+                elif main_game.state == "PAUSED":
+                    if event.key == pygame.K_p:
+                        main_game.state = "PLAYING"
+                        play_sound("menu_select.wav")
+                    if event.key == pygame.K_m:
+                        main_game.state = "MAIN_MENU"
+                        play_sound("menu_select.wav")
+
+                # --- GAME OVER controls ---
+                elif main_game.state == "GAME_OVER":
+                    if event.key == pygame.K_RETURN or event.key == pygame.K_KP_ENTER:
+                        # Play again with same settings
+                        play_sound("menu_select.wav")
+                        main_game.start_game()
+                    if event.key == pygame.K_m:
+                        main_game.state = "MAIN_MENU"
+                        play_sound("menu_select.wav")
+
+                # Menu selection/options changed what is on screen
+                if main_game.state != "PLAYING":
+                    main_game.full_redraw = True
+
+        if resized:
+            fit_window(main_game)
+        profiler.record("events", started)
+
+        # ----- Fixed-step simulation -----
+        ticks = scheduler.ticks_due(main_game.state == "PLAYING")
+        for _ in range(ticks):
+            started = profiler.start()
+            main_game.update()
+            profiler.record("update", started)
+
+        # ----- Drawing -----
+        started = profiler.start()
+        dirty_rects = main_game.render(scheduler.alpha() if scheduler.interpolate else None)
+        if profiler.overlay:
+            dirty_rects.append(profiler.draw())
+        profiler.record("render", started)
+        started = profiler.start()
+        if dirty_rects:
+            # rects are in board pixels; the board may sit letterboxed inside the window
+            offset = screen.get_abs_offset()
+            pygame.display.update([rect.move(offset) for rect in dirty_rects])
+        profiler.record("display update", started)
+        profiler.frame(ticks)
+        main_game.report_latency()
+        if first_frame:
+            first_frame = False
+            if startup_time:
+                print(f"time to first frame: {(time.perf_counter() - START_TIME) * 1000:.1f} ms")
+                quit_game()
+            # warm game sprites for both skins while the player is still in the menu
+            assets.preload([(skin, name, (cell_size, cell_size))
+                            for skin in (main_game.skin_index, 3 - main_game.skin_index)
+                            for name in TILE_NAMES + ("apple",)])
+        scheduler.pace()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hungry Python - a Snake game")
+    parser.add_argument("--fps", type=int, default=60, help="render frame-rate cap (default: 60)")
+    parser.add_argument("--smooth", action="store_true", help="interpolate snake motion between ticks")
+    parser.add_argument("--startup-time", action="store_true", help="print the time to the first frame and exit")
+    parser.add_argument("--board", type=int, default=cell_number, help="board side in cells (default: 17)")
+    parser.add_argument("--view", type=int, default=view_cells, help="window side in cells (default: 17)")
+    parser.add_argument("--seed", type=int, help="seed for the first game; later games use seed+1, seed+2, ...")
+    parser.add_argument("--record", metavar="DIR", help="save every finished game as a replay in DIR")
+    parser.add_argument("--replay", metavar="FILE", help="play back a recorded game")
+    parser.add_argument("--instant-turns", action="store_true",
+                        help="step the snake as soon as a turn is pressed instead of on the next tick")
+    parser.add_argument("--trace", metavar="FILE", help="write a Chrome trace of every frame phase on quit")
+    parser.add_argument("--autopilot", action="store_true", help="let the computer play (demo/soak mode)")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay/autopilot speed multiplier (default: 1)")
+    parser.add_argument("--fullscreen", action="store_true", help="start fullscreen (F11 toggles)")
+    parser.add_argument("--sprite-cache", metavar="DIR",
+                        help="keep sprites scaled for each cell size in DIR, so later launches skip the scaling")
+    args = parser.parse_args(argv)
+
+    playback = None
+    if args.replay:
+        try:
+            playback = REPLAY.load(args.replay)
+        except ValueError as error:
+            parser.error(f"--replay: {error}")
+        args.board = playback.cell_number  # replays play on the board they were recorded on
+    if min(args.board, args.view) < 17:
+        parser.error("the menus need a board and window of at least 17 cells")
+    if not 0 < args.speed < float("inf"):
+        parser.error("--speed must be a positive number")  # it divides the tick interval
+    if args.seed is not None and not 0 <= args.seed <= SEED_MASK:
+        parser.error(f"--seed must be between 0 and {SEED_MASK}")  # replays store it as a u64
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+    profiler.trace_path = args.trace
+    main_game = setup(args.fps, args.smooth, board=args.board, view=args.view, seed=args.seed,
+                      record_dir=args.record, playback=playback, speed=args.speed if playback or args.autopilot else 1.0,
+                      autopilot=args.autopilot, instant_turns=args.instant_turns,
+                      fullscreen=args.fullscreen, sprite_cache=args.sprite_cache)
+    run(main_game, startup_time=args.startup_time)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Deterministic replays.
+
+A game is fully determined by its seed and the turns the player made, so a
+replay stores only those: a fixed header followed by one varint per turn,
+`(tick_delta << 2) | direction_index`. A typical game fits in a few hundred bytes.
+
+    python replay.py info FILE      # header and event count
+    python replay.py verify FILE    # re-simulate headlessly and check the score
+    python replay.py bench FILE     # headless re-simulation speed
+"""
+import bisect, struct, sys, time, argparse
+
+from engine import GAME_CORE, DIRECTIONS, TICK_MS, MIN_CELL_NUMBER
+
+MAGIC = b"HPRL"
+VERSION = 1
+# magic, version, cell_number, difficulty_index, seed, ticks, score, event count
+HEADER = struct.Struct("<4sBHBQIII")
+
+
+class REPLAY:
+    def __init__(self, seed, cell_number=17, difficulty_index=1, events=None, ticks=0, score=0):
+        self.seed = seed
+        self.cell_number = cell_number
+        self.difficulty_index = difficulty_index
+        self.events = events if events is not None else []  # (tick, direction index)
+        self.ticks = ticks
+        self.score = score
+
+    def record(self, tick, direction):
+        # `tick` is the number of ticks already simulated when the turn was made
+        self.events.append((tick, DIRECTIONS.index(direction)))
+
+    def rewind(self, tick):
+        # Forget the turns made at or after `tick` (the game was rolled back to it)
+        while self.events and self.events[-1][0] >= tick:
+            self.events.pop()
+
+    def finish(self, game):
+        self.ticks = game.ticks
+        self.score = game.score
+
+    def to_bytes(self):
+        out = bytearray(HEADER.pack(MAGIC, VERSION, self.cell_number, self.difficulty_index,
+                                    self.seed, self.ticks, self.score, len(self.events)))
+        last = 0
+        for tick, direction in self.events:
+            value = ((tick - last) << 2) | direction
+            last = tick
+            # unsigned LEB128 varint
+            while value >= 0x80:
+                out.append((value & 0x7F) | 0x80)
+                value >>= 7
+            out.append(value)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        # Files may come from anywhere (leaderboard submissions): anything malformed is a ValueError
+        if len(data) < HEADER.size:
+            raise ValueError("too short for a replay header")
+        magic, version, cell_number, difficulty_index, seed, ticks, score, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a Hungry Python replay (or an unsupported version)")
+        if cell_number < MIN_CELL_NUMBER:
+            raise ValueError(f"board {cell_number} is smaller than {MIN_CELL_NUMBER} cells")
+        if difficulty_index >= len(TICK_MS):
+            raise ValueError(f"unknown difficulty {difficulty_index}")
+        if count > len(data) - HEADER.size:
+            raise ValueError(f"{count} turns cannot fit in {len(data) - HEADER.size} bytes")
+        events = []
+        pos = HEADER.size
+        tick = 0
+        for _ in range(count):
+            value = shift = 0
+            while True:
+                if pos == len(data):
+                    raise ValueError(f"truncated after {len(events)} of {count} turns")
+                byte = data[pos]
+                pos += 1
+                value |= (byte & 0x7F) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            tick += value >> 2
+            events.append((tick, value & 3))
+        if pos != len(data):
+            raise ValueError(f"{len(data) - pos} bytes after the last turn")
+        return cls(seed, cell_number, difficulty_index, events, ticks, score)
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+
+class REPLAY_PLAYER:
+    """Feeds a replay's turns into a game; call apply() right before each update()."""
+
+    def __init__(self, replay):
+        self.events = replay.events
+        self.index = 0
+
+    def seek(self, tick):
+        # Continue from a game rolled back (or forward) to `tick`
+        self.index = bisect.bisect_left(self.events, (tick,))
+
+    def apply(self, game):
+        while self.index < len(self.events) and self.events[self.index][0] <= game.ticks:
+            # through apply_turn, like any other input, so a replay played with --record re-records
+            game.apply_turn(DIRECTIONS[self.events[self.index][1]])
+            self.index += 1
+
+
+def simulate(replay, game=None):
+    # Headless re-simulation up to the recorded tick count (or an earlier game over)
+    if game is None:
+        game = GAME_CORE(replay.cell_number, start=False)
+    game.start_game(seed=replay.seed)
+    player = REPLAY_PLAYER(replay)
+    while game.state == "PLAYING" and game.ticks < replay.ticks:
+        player.apply(game)
+        game.update()
+    return game
+
+
+def verify(replay):
+    game = simulate(replay)
+    return game.ticks == replay.ticks and game.score == replay.score
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, verify or benchmark Hungry Python replays")
+    parser.add_argument("command", choices=("info", "verify", "bench"))
+    parser.add_argument("file")
+    parser.add_argument("--repeat", type=int, default=100, help="re-simulations for bench (default: 100)")
+    args = parser.parse_args(argv)
+
+    try:
+        replay = REPLAY.load(args.file)
+    except ValueError as error:
+        print(f"INVALID: {error}")
+        return 1
+    if args.command == "info":
+        print(f"seed={replay.seed} board={replay.cell_number} difficulty={replay.difficulty_index} "
+              f"ticks={replay.ticks} score={replay.score} turns={len(replay.events)}")
+    elif args.command == "verify":
+        ok = verify(replay)
+        print("OK" if ok else "MISMATCH")
+        return 0 if ok else 1
+    else:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            simulate(replay)
+        elapsed = time.perf_counter() - start
+        print(f"{replay.ticks * args.repeat / elapsed:,.0f} ticks/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,442 @@
+"""
+Multiplayer server: many games in one asyncio process, no pygame.
+
+The server owns the clock and the rules (SNAKE_CORE / FRUIT_CORE from engine.py);
+clients only send direction changes. Every game is a ROOM: a solo room holds one
+player, a shared room up to --room-size snakes on one board, where every other
+snake is an obstacle. All rooms advance from one tick loop.
+
+After a full snapshot on join, each tick costs a client one delta frame: per snake
+that changed, the head cell added / whether the tail left / died / respawned, plus
+fruit that moved. Its size depends on the number of snakes, never on their length.
+
+    python server.py serve --port 8765                      # host games
+    python server.py load --clients 500 --shared 0.5        # localhost load test with delta checks
+
+Wire format: every message is a u32 length followed by the payload; integers are
+little-endian. Client to server: JOIN b"J" + mode (0 solo, 1 shared), TURN b"T" +
+direction index, SYNC b"S" (asks for a full snapshot). Server to client: WELCOME,
+FULL and DELTA frames, see the encoders below.
+"""
+import sys, time, random, struct, asyncio, argparse
+from collections import deque
+
+from engine import SNAKE_CORE, FRUIT_CORE, GAME_CORE, GRID, DIRECTIONS, RIGHT, TICK_MS, cell_index
+
+LENGTH = struct.Struct("<I")
+WELCOME = struct.Struct("<cHHH")  # b"W", player id, cell_number, tick ms
+FULL_HEAD = struct.Struct("<cIB")  # b"F", tick, fruit count; then fruit cells, snake count, snakes
+DELTA_HEAD = struct.Struct("<cIB")  # b"D", tick, moved fruit count; then (index, cell) pairs, entries
+U8, U16, U32 = struct.Struct("<B"), struct.Struct("<H"), struct.Struct("<I")
+ENTRY = struct.Struct("<HB")  # snake id, flags
+FRUIT_MOVE = struct.Struct("<BI")
+
+HEAD, TAIL, DIED, SPAWN = 1, 2, 4, 8  # DELTA entry flags
+NO_CELL = 0xFFFFFFFF  # fruit slot with no fruit (board full)
+SPAWN_LENGTH = 3
+SPAWN_TRIES = 50
+MAX_BUFFER = 256 * 1024  # a client further behind than this is dropped
+
+
+# ---------------------- Game Rooms ---------------------- #
+class PLAYER:
+    queue_turn = GAME_CORE.queue_turn  # same input buffering rules as a local game
+
+    def __init__(self, writer):
+        self.id = None  # set by ROOM.add: the lowest id free in that room
+        self.writer = writer
+        self.snake = None  # None while waiting to (re)spawn
+        self.turns = deque()
+
+    def turn(self, direction):
+        if self.snake is not None:
+            self.queue_turn(direction)
+
+
+class ROOM:
+    """One board: its snakes share a GRID, so each sees the others as obstacles."""
+
+    def __init__(self, cell_number, capacity, fruits=1, seed=None):
+        self.cell_number = cell_number
+        self.capacity = capacity
+        self.rng = random.Random(seed)
+        self.grid = GRID(cell_number * cell_number)
+        self.fruits = [FRUIT_CORE(self.grid, cell_number, self.rng) for _ in range(fruits)]
+        for fruit in self.fruits:
+            self.place(fruit)
+        self.players = {}
+        self.departed = []  # ids that left since the last tick; announced as DIED
+        self.ticks = 0
+
+    def full(self):
+        return len(self.players) >= self.capacity
+
+    def add(self, player):
+        # ids are per room, so they stay small and are never shared by two players present
+        player.id = next(i for i in range(self.capacity) if i not in self.players)
+        self.players[player.id] = player
+
+    def remove(self, player):
+        del self.players[player.id]
+        if player.snake is not None:
+            self.release(player.snake)
+            self.departed.append(player.id)
+
+    def release(self, snake):
+        # after a crash into another snake the head cell belongs to that snake
+        cells = list(snake.body)[1:] if snake.crash_cause == "self" else snake.body
+        for cell in cells:
+            self.grid.release(cell)
+
+    def place(self, fruit):
+        # GRID.free only knows about snakes: redraw while the fruit shares a cell with another
+        taken = {other.cell for other in self.fruits if other is not fruit}
+        taken.discard(None)
+        while fruit.cell in taken:
+            if len(self.grid.free) <= len(taken):
+                fruit.cell = None  # every free cell already holds a fruit
+                return
+            fruit.randomize()
+
+    def spawn_cells(self):
+        # a free horizontal run heading right, with room ahead to react
+        n = self.cell_number
+        occupied = self.grid.occupied
+        fruit_cells = {fruit.cell for fruit in self.fruits}
+        for _ in range(SPAWN_TRIES):
+            x, y = self.rng.randrange(SPAWN_LENGTH - 1, n - SPAWN_LENGTH), self.rng.randrange(n)
+            cells = [cell_index(x - i, y, n) for i in range(-SPAWN_LENGTH, SPAWN_LENGTH)]
+            if not any(occupied[cell] for cell in cells) and not fruit_cells.intersection(cells):
+                return cells[SPAWN_LENGTH:]  # head first
+        return None
+
+    def step(self):
+        # One tick; returns the DELTA frame every player in the room receives
+        self.ticks += 1
+        # before any spawn, so a newcomer reusing a departed id starts from a clean slate
+        entries = [ENTRY.pack(player_id, DIED) for player_id in self.departed]
+        self.departed.clear()
+        moving = []
+        for player in self.players.values():
+            if player.snake is None:
+                cells = self.spawn_cells()
+                if cells is not None:
+                    player.snake = SNAKE_CORE(self.cell_number, self.grid, cells)
+                    player.snake.direction = RIGHT
+                    player.turns.clear()
+                    entries.append(ENTRY.pack(player.id, SPAWN) + U8.pack(len(cells))
+                                   + b"".join(U32.pack(cell) for cell in cells))
+                continue
+            if player.turns:
+                player.snake.change_direction(player.turns.popleft()[0])
+            length = len(player.snake.body)
+            player.snake.move_snake()
+            moving.append((player, length))
+
+        moved_fruit = []
+        for player, length in moving:
+            snake = player.snake
+            if snake.crashed:
+                self.release(snake)
+                player.snake = None
+                entries.append(ENTRY.pack(player.id, DIED))
+                continue
+            flags = HEAD if len(snake.body) > length else HEAD | TAIL
+            entries.append(ENTRY.pack(player.id, flags) + U32.pack(snake.body[0]))
+            for index, fruit in enumerate(self.fruits):
+                if fruit.cell == snake.body[0]:
+                    snake.add_block()
+                    fruit.randomize()
+                    self.place(fruit)
+                    moved_fruit.append(FRUIT_MOVE.pack(index, NO_CELL if fruit.cell is None else fruit.cell))
+        for index, fruit in enumerate(self.fruits):
+            if fruit.cell is None and self.grid.free:
+                fruit.randomize()  # a full board emptied again
+                self.place(fruit)
+                if fruit.cell is not None:
+                    moved_fruit.append(FRUIT_MOVE.pack(index, fruit.cell))
+
+        return b"".join([DELTA_HEAD.pack(b"D", self.ticks, len(moved_fruit)), *moved_fruit,
+                         U16.pack(len(entries)), *entries])
+
+    def snapshot(self):
+        parts = [FULL_HEAD.pack(b"F", self.ticks, len(self.fruits))]
+        parts.extend(U32.pack(NO_CELL if fruit.cell is None else fruit.cell) for fruit in self.fruits)
+        alive = [player for player in self.players.values() if player.snake is not None]
+        parts.append(U16.pack(len(alive)))
+        for player in alive:
+            body = player.snake.body
+            parts.append(U16.pack(player.id) + U32.pack(len(body)))
+            parts.append(struct.pack(f"<{len(body)}I", *body))
+        return b"".join(parts)
+
+
+def frame(payload):
+    return LENGTH.pack(len(payload)) + payload
+
+
+async def read_message(reader):
+    (size,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+    return await reader.readexactly(size)
+
+
+# ---------------------- Server ---------------------- #
+class SERVER:
+    def __init__(self, cell_number=17, tick_ms=TICK_MS[1], room_size=8, fruits=1, seed=None):
+        self.cell_number = cell_number
+        self.tick_ms = tick_ms
+        self.room_size = room_size
+        self.fruits = fruits
+        self.rng = random.Random(seed)
+        self.rooms = []
+        self.ticks = 0
+        self.bytes_sent = 0
+        self.tick_time = 0.0
+        self.slowest_tick = 0.0
+
+    def join(self, player, shared):
+        room = None
+        if shared:
+            room = next((r for r in self.rooms if r.capacity > 1 and not r.full()), None)
+        if room is None:
+            room = ROOM(self.cell_number, self.room_size if shared else 1, self.fruits, self.rng.getrandbits(32))
+            self.rooms.append(room)
+        room.add(player)
+        return room
+
+    def send(self, player, payload):
+        data = frame(payload)
+        player.writer.write(data)
+        self.bytes_sent += len(data)
+
+    async def handle(self, reader, writer):
+        player = room = None
+        try:
+            message = await read_message(reader)
+            if message[:1] != b"J":
+                return
+            player = PLAYER(writer)
+            room = self.join(player, shared=len(message) > 1 and message[1] == 1)
+            self.send(player, WELCOME.pack(b"W", player.id, self.cell_number, self.tick_ms))
+            self.send(player, room.snapshot())
+            while True:
+                message = await read_message(reader)
+                kind = message[:1]
+                if kind == b"T" and len(message) == 2 and message[1] < len(DIRECTIONS):
+                    player.turn(DIRECTIONS[message[1]])
+                elif kind == b"S":
+                    self.send(player, room.snapshot())
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if room is not None:
+                room.remove(player)
+                if not room.players:
+                    self.rooms.remove(room)
+            writer.close()
+
+    def tick(self):
+        start = time.perf_counter()
+        for room in self.rooms:
+            data = frame(room.step())  # encoded once, the same bytes go to every player in the room
+            for player in list(room.players.values()):
+                if player.writer.transport.get_write_buffer_size() > MAX_BUFFER:
+                    player.writer.transport.abort()  # handle() cleans up
+                    continue
+                player.writer.write(data)
+                self.bytes_sent += len(data)
+        self.ticks += 1
+        elapsed = time.perf_counter() - start
+        self.tick_time += elapsed
+        self.slowest_tick = max(self.slowest_tick, elapsed)
+
+    async def tick_loop(self):
+        # fixed-rate schedule: a slow tick shortens the next wait rather than drifting
+        loop = asyncio.get_running_loop()
+        interval = self.tick_ms / 1000
+        deadline = loop.time()
+        while True:
+            deadline += interval
+            self.tick()
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+
+    async def report_loop(self, every):
+        while True:
+            ticks, sent, tick_time = self.ticks, self.bytes_sent, self.tick_time
+            self.slowest_tick = 0.0
+            await asyncio.sleep(every)
+            ticks = self.ticks - ticks
+            players = sum(len(room.players) for room in self.rooms)
+            print(f"{len(self.rooms)} rooms, {players} players, "
+                  f"tick {(self.tick_time - tick_time) / max(ticks, 1) * 1000:.2f} ms "
+                  f"(max {self.slowest_tick * 1000:.2f}), {(self.bytes_sent - sent) / every / 1024:.1f} KiB/s out",
+                  flush=True)
+
+    async def serve(self, host, port, report=5.0):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"serving {self.cell_number}x{self.cell_number} boards on {host}:{port}, "
+              f"tick {self.tick_ms} ms", flush=True)
+        tasks = [asyncio.create_task(self.tick_loop())]
+        if report:
+            tasks.append(asyncio.create_task(self.report_loop(report)))
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+
+# ---------------------- Client ---------------------- #
+class CLIENT:
+    """A headless client: mirrors the room from DELTA frames and turns at random."""
+
+    def __init__(self, shared, seed=None, turn_chance=0.2, sync_every=0):
+        self.shared = shared
+        self.rng = random.Random(seed)
+        self.turn_chance = turn_chance
+        self.sync_every = sync_every
+        self.id = None
+        self.cell_number = None
+        self.tick = 0
+        self.fruits = []
+        self.snakes = {}  # id -> deque of cells, head first
+        self.frames = 0
+        self.bytes = 0
+        self.syncs = 0
+        self.mismatches = 0
+
+    async def run(self, host, port, seconds):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(frame(b"J" + bytes([1 if self.shared else 0])))
+        loop = asyncio.get_running_loop()
+        end = loop.time() + seconds
+        try:
+            while loop.time() < end:
+                message = await asyncio.wait_for(read_message(reader), max(0.01, end - loop.time()))
+                self.bytes += LENGTH.size + len(message)
+                kind = message[:1]
+                if kind == b"W":
+                    _, self.id, self.cell_number, _ = WELCOME.unpack(message)
+                elif kind == b"F":
+                    self.check(message)
+                elif kind == b"D":
+                    self.apply(message)
+                    self.frames += 1
+                    if self.id in self.snakes and self.rng.random() < self.turn_chance:
+                        writer.write(frame(b"T" + bytes([self.rng.randrange(len(DIRECTIONS))])))
+                    if self.sync_every and self.frames % self.sync_every == 0:
+                        writer.write(frame(b"S"))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            writer.close()
+
+    def apply(self, message):
+        _, self.tick, moved = DELTA_HEAD.unpack_from(message)
+        pos = DELTA_HEAD.size
+        for _ in range(moved):
+            index, cell = FRUIT_MOVE.unpack_from(message, pos)
+            self.fruits[index] = None if cell == NO_CELL else cell
+            pos += FRUIT_MOVE.size
+        (count,) = U16.unpack_from(message, pos)
+        pos += U16.size
+        for _ in range(count):
+            snake_id, flags = ENTRY.unpack_from(message, pos)
+            pos += ENTRY.size
+            if flags & SPAWN:
+                length = message[pos]
+                self.snakes[snake_id] = deque(struct.unpack_from(f"<{length}I", message, pos + 1))
+                pos += 1 + 4 * length
+            elif flags & DIED:
+                self.snakes.pop(snake_id, None)
+            else:
+                body = self.snakes[snake_id]
+                body.appendleft(U32.unpack_from(message, pos)[0])
+                pos += U32.size
+                if flags & TAIL:
+                    body.pop()
+
+    def read_full(self, message):
+        _, tick, fruit_count = FULL_HEAD.unpack_from(message)
+        pos = FULL_HEAD.size
+        fruits = [None if cell == NO_CELL else cell
+                  for cell in struct.unpack_from(f"<{fruit_count}I", message, pos)]
+        pos += 4 * fruit_count
+        (count,) = U16.unpack_from(message, pos)
+        pos += U16.size
+        snakes = {}
+        for _ in range(count):
+            snake_id, length = struct.unpack_from("<HI", message, pos)
+            pos += 6
+            snakes[snake_id] = deque(struct.unpack_from(f"<{length}I", message, pos))
+            pos += 4 * length
+        return tick, fruits, snakes
+
+    def check(self, message):
+        # the first FULL seeds the mirror; later ones (SYNC replies) must match it exactly
+        tick, fruits, snakes = self.read_full(message)
+        if self.syncs and (tick, fruits, snakes) != (self.tick, self.fruits, self.snakes):
+            self.mismatches += 1
+        self.syncs += 1
+        self.tick, self.fruits, self.snakes = tick, fruits, snakes
+
+
+async def load_test(host, port, clients, shared, seconds, sync_every, seed):
+    rng = random.Random(seed)
+    players = [CLIENT(rng.random() < shared, rng.getrandbits(32), sync_every=sync_every) for _ in range(clients)]
+    results = await asyncio.gather(*(player.run(host, port, seconds) for player in players), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, Exception)]
+    frames = sum(player.frames for player in players)
+    sent = sum(player.bytes for player in players)
+    print(f"{clients} clients ({sum(p.shared for p in players)} shared) for {seconds:.0f} s: "
+          f"{frames} frames, {sent / max(frames, 1):.1f} bytes/frame, "
+          f"{sent / seconds / max(clients, 1):.0f} bytes/s per client, "
+          f"{sum(max(p.syncs - 1, 0) for p in players)} syncs checked, "
+          f"{sum(p.mismatches for p in players)} mismatches, {len(errors)} errors")
+    for error in errors[:5]:
+        print(f"  {type(error).__name__}: {error}")
+    return 1 if errors or any(p.mismatches for p in players) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host Hungry Python games over TCP, or load-test a server")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="run the game server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--board", type=int, default=17, help="board side in cells (default: 17)")
+    serve.add_argument("--difficulty", type=int, default=1, choices=range(len(TICK_MS)),
+                       help="tick speed, 0 Easy .. 2 Hard (default: 1)")
+    serve.add_argument("--room-size", type=int, default=8, help="snakes per shared board (default: 8)")
+    serve.add_argument("--fruits", type=int, default=1, help="fruit per board (default: 1)")
+    serve.add_argument("--seed", type=int, help="seed for room boards")
+    serve.add_argument("--report", type=float, default=5.0, help="seconds between status lines, 0 for none")
+    load = sub.add_parser("load", help="connect many headless clients to a server")
+    load.add_argument("--host", default="127.0.0.1")
+    load.add_argument("--port", type=int, default=8765)
+    load.add_argument("--clients", type=int, default=100, help="connections (default: 100)")
+    load.add_argument("--shared", type=float, default=0.0, help="fraction joining shared boards (default: 0)")
+    load.add_argument("--seconds", type=float, default=10.0, help="test length (default: 10)")
+    load.add_argument("--sync-every", type=int, default=20,
+                      help="ask for a full snapshot every N frames and compare it with the mirror, 0 never")
+    load.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        if args.board < 2 * SPAWN_LENGTH + 1:
+            parser.error(f"board must be at least {2 * SPAWN_LENGTH + 1} cells")
+        if not 1 <= args.room_size <= 0x10000:
+            parser.error("room size must be between 1 and 65536 (player ids are u16)")
+        server = SERVER(args.board, TICK_MS[args.difficulty], args.room_size, args.fruits, args.seed)
+        try:
+            asyncio.run(server.serve(args.host, args.port, args.report))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    return asyncio.run(load_test(args.host, args.port, args.clients, args.shared, args.seconds,
+                                 args.sync_every, args.seed))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
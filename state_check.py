@@ -0,0 +1,96 @@
+"""
+Consistency check for engine.GAME_STATE, the second copy of the rules.
+
+Plays seeded games on GAME_CORE and steps a GAME_STATE alongside with the same turns,
+comparing them every tick (the board grid in full every few ticks). Clones taken along
+the way get stray steps of their own and must still match the game as it was, and a
+restore() in the middle of each game must replay to the same result.
+
+    python state_check.py                          # default boards and games
+    python state_check.py --boards 11 17 64 --games 50
+"""
+import sys, random, argparse
+
+from engine import GAME_CORE, DIRECTIONS, MIN_CELL_NUMBER
+from autopilot import AUTOPILOT
+
+
+def state_key(state):
+    return (list(state.body()), state.fruit, state.ticks, state.state, state.won,
+            state.direction, state.new_block, state.crash_cause)
+
+
+def game_key(game):
+    return (list(game.snake.body), game.fruit.cell, game.ticks, game.state, game.won,
+            game.snake.direction, game.snake.new_block, game.snake.crash_cause)
+
+
+def same_grid(state, game):
+    grid, other = state.grid(), game.snake.grid
+    return grid.occupied == other.occupied and grid.free == other.free and grid.free_pos == other.free_pos
+
+
+def check_game(cell_number, seed, max_ticks, pilot):
+    # Returns a list of problems found in one game (empty when all is well)
+    rng = random.Random(seed)
+    game = GAME_CORE(cell_number, start=False)
+    game.start_game(seed=seed)
+    state = game.snapshot()
+    saved = []  # (clone, game key when it was taken, inputs from then on)
+    inputs = []
+    problems = []
+    while game.state == "PLAYING" and game.ticks < max_ticks:
+        direction = pilot.choose(game) if rng.random() < 0.9 else rng.choice(DIRECTIONS)
+        if rng.random() < 0.05:
+            saved.append((state.clone(), game_key(game), len(inputs)))
+            stray = state.clone()
+            stray.step(rng.choice(DIRECTIONS))
+            stray.step()
+        inputs.append(direction)
+        game.step(direction)
+        state.step(direction)
+        if state_key(state) != game_key(game):
+            return problems + [f"diverged at tick {game.ticks}"]
+        if game.ticks % 16 == 0 and not same_grid(state, game):
+            return problems + [f"grid differs at tick {game.ticks}"]
+
+    for clone, key, _ in saved:
+        if state_key(clone) != key:
+            problems.append(f"clone from tick {key[2]} was changed by a later branch")
+    if saved:
+        # rollback: restore a mid-game state and replay the same turns
+        clone, key, position = saved[len(saved) // 2]
+        final = game_key(game)
+        game.restore(clone)
+        if game_key(game) != key:
+            problems.append(f"restore to tick {key[2]} differs")
+        for direction in inputs[position:]:
+            game.step(direction)
+        if game_key(game) != final:
+            problems.append(f"replay after restore to tick {key[2]} differs")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that GAME_STATE follows GAME_CORE exactly")
+    parser.add_argument("--boards", type=int, nargs="+", default=[11, 12, 17, 40], help="board sizes")
+    parser.add_argument("--games", type=int, default=10, help="seeded games per board (default: 10)")
+    parser.add_argument("--max-ticks", type=int, default=3000, help="ticks per game at most (default: 3000)")
+    args = parser.parse_args(argv)
+    if min(args.boards) < MIN_CELL_NUMBER:
+        parser.error(f"boards must be at least {MIN_CELL_NUMBER} cells (the snake starts at row 10)")
+
+    failures = 0
+    for cell_number in args.boards:
+        pilot = AUTOPILOT(cell_number)
+        for seed in range(args.games):
+            for problem in check_game(cell_number, seed, args.max_ticks, pilot):
+                failures += 1
+                print(f"board {cell_number} seed {seed}: {problem}")
+        print(f"board {cell_number}: {args.games} games checked")
+    print("OK" if not failures else f"{failures} problems")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())